@@ -9,15 +9,48 @@ except Exception:
 
 import os
 from flask import Flask, send_from_directory
+from flask.json.provider import DefaultJSONProvider
 from flask_sqlalchemy import SQLAlchemy
 from flask_cors import CORS
 from config import config
 import atexit
+import asyncio
 import threading
 import time
 
 db = SQLAlchemy()
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import uvloop
+except ImportError:
+    uvloop = None
+
+
+class OrjsonJSONProvider(DefaultJSONProvider):
+    """使用orjson进行JSON编解码，orjson不支持的类型仍交给Flask默认处理"""
+    
+    def dumps(self, obj, **kwargs):
+        option = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_PASSTHROUGH_DATETIME
+        
+        # 调试模式下Flask以indent=2输出，orjson原生支持；其他缩进宽度沿用标准库实现
+        indent = kwargs.get('indent')
+        if indent == 2:
+            option |= orjson.OPT_INDENT_2
+        elif indent is not None:
+            return super().dumps(obj, **kwargs)
+        
+        if kwargs.get('sort_keys', self.sort_keys):
+            option |= orjson.OPT_SORT_KEYS
+        return orjson.dumps(obj, default=self.default, option=option).decode('utf-8')
+    
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
 
 
 def cleanup_temp_images():
@@ -39,10 +72,36 @@ def start_cleanup_scheduler():
     cleanup_thread = threading.Thread(target=cleanup_task, daemon=True)
     cleanup_thread.start()
 
+def start_vector_service_warmup(app):
+    """后台预热向量服务：提前建立Milvus连接并加载嵌入模型，避免首个搜索请求承担初始化耗时"""
+    def warmup_task():
+        try:
+            from app.services.vectorization import get_vector_service, get_vector_service_config
+            
+            with app.app_context():
+                configured = get_vector_service_config()
+            
+            # 语义搜索使用默认参数，混合搜索使用系统配置参数；两者相同时第二次调用直接命中缓存
+            get_vector_service()
+            get_vector_service(*configured)
+        except Exception as e:
+            print(f"预热向量服务时出错: {e}")
+    
+    warmup_thread = threading.Thread(target=warmup_task, daemon=True)
+    warmup_thread.start()
+
 def create_app(config_name=None):
     """Flask应用工厂函数"""
     app = Flask(__name__)
     
+    # 响应JSON编码使用orjson（未安装时保持Flask默认实现）
+    if orjson is not None:
+        app.json = OrjsonJSONProvider(app)
+    
+    # MCP调用在后台事件循环中执行，安装uvloop时使用其事件循环实现
+    if uvloop is not None:
+        asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+    
     # 配置
     config_name = config_name or os.getenv('FLASK_CONFIG') or 'default'
     app.config.from_object(config[config_name])
@@ -60,6 +119,11 @@ def create_app(config_name=None):
     # 程序退出时清理临时图片
     atexit.register(cleanup_temp_images)
     
+    # 预热向量服务（调试模式下仅在重载器子进程中执行，避免重复加载模型）
+    if app.config.get('ENABLE_VECTOR_SERVICE_WARMUP') and (
+            not app.config.get('DEBUG') or os.environ.get('WERKZEUG_RUN_MAIN') == 'true'):
+        start_vector_service_warmup(app)
+    
     # MCP服务使用标准协议实现，按需初始化
     
     # 注册蓝图
@@ -59,6 +59,18 @@ class DocumentNode(db.Model):
             'tags': [tag.to_dict() for tag in self.tags] if self.tags else []
         }
     
+    def to_search_dict(self):
+        """转换为搜索结果中使用的精简字典（只包含文件级结果展示需要的字段）"""
+        return {
+            'id': self.id,
+            'name': self.name,
+            'file_type': self.file_type,
+            'file_path': self.file_path,
+            'description': self.description,
+            'file_size': self.file_size,
+            'parent_id': self.parent_id
+        }
+    
     def to_tree_dict(self):
         """转换为树形结构字典"""
         result = self.to_dict()
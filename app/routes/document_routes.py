@@ -1,6 +1,7 @@
 from flask import Blueprint, request, jsonify, send_file, abort
 from app import db
 from app.models import DocumentNode, SystemConfig, Tag, DocumentTag
+from app.services.vectorization.search_cache import bump_index_generation
 import logging
 import os
 
@@ -181,6 +182,8 @@ def update_document(doc_id):
     try:
         doc = DocumentNode.query.get_or_404(doc_id)
         data = request.get_json()
+        # 名称或位置变化时，已缓存的搜索响应中的文件名和路径会过期
+        name_or_location_changed = False
         
         # 更新基本信息
         if 'name' in data:
@@ -197,6 +200,7 @@ def update_document(doc_id):
                     'error': '同级目录下已存在相同名称的文件'
                 }), 400
             
+            name_or_location_changed = name_or_location_changed or doc.name != data['name']
             doc.name = data['name']
         
         if 'description' in data:
@@ -221,6 +225,7 @@ def update_document(doc_id):
                         'error': '不能移动到自己的子目录下'
                     }), 400
             
+            name_or_location_changed = name_or_location_changed or doc.parent_id != new_parent_id
             doc.parent_id = new_parent_id
         
         # 处理标签更新
@@ -252,6 +257,9 @@ def update_document(doc_id):
         
         db.session.commit()
         
+        if name_or_location_changed:
+            bump_index_generation()
+        
         # 重新查询以获取更新后的标签信息
         updated_doc = DocumentNode.query.get(doc_id)
         
@@ -335,6 +343,9 @@ def delete_document(doc_id):
         
         db.session.commit()
         
+        # 已缓存的搜索响应可能包含被删除的文档，递增版本号使其失效
+        bump_index_generation()
+        
         return jsonify({
             'success': True,
             'message': '删除成功'
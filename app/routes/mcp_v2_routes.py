@@ -4,25 +4,16 @@
 """
 
 from flask import Blueprint, request, jsonify
-import asyncio
 import logging
 from typing import Dict, Any
+from app.services.mcp.servers.mcp_manager import get_mcp_manager
+from app.services.mcp.event_loop import run_coroutine
 
 logger = logging.getLogger(__name__)
 
 # 创建蓝图
 mcp_v2_bp = Blueprint('mcp_v2', __name__, url_prefix='/api/mcp/v2')
 
-# 全局MCP管理器实例
-mcp_manager = None
-
-def get_mcp_manager():
-    """获取MCP管理器实例"""
-    global mcp_manager
-    if mcp_manager is None:
-        from app.services.mcp.servers.mcp_manager import MCPManager
-        mcp_manager = MCPManager()
-    return mcp_manager
 
 @mcp_v2_bp.route('/status', methods=['GET'])
 def get_mcp_status():
@@ -55,11 +46,8 @@ def initialize_mcp():
     try:
         manager = get_mcp_manager()
         
-        # 在后台运行异步初始化
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-        success = loop.run_until_complete(manager.initialize())
-        loop.close()
+        # 在后台事件循环中运行异步初始化
+        success = run_coroutine(manager.initialize())
         
         if success:
             return jsonify({
@@ -269,11 +257,8 @@ def call_tool():
                 "error": "MCP系统未初始化"
             }), 400
         
-        # 在后台运行异步工具调用
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-        result = loop.run_until_complete(manager.call_tool(tool_name, arguments, server_name))
-        loop.close()
+        # 在后台事件循环中运行异步工具调用
+        result = run_coroutine(manager.call_tool(tool_name, arguments, server_name))
         
         return jsonify({
             "success": not result.isError,
@@ -374,11 +359,8 @@ def reload_config():
     try:
         manager = get_mcp_manager()
         
-        # 在后台运行异步重新加载
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-        success = loop.run_until_complete(manager.reload_config())
-        loop.close()
+        # 在后台事件循环中运行异步重新加载
+        success = run_coroutine(manager.reload_config())
         
         if success:
             return jsonify({
@@ -425,11 +407,8 @@ def check_services_installation():
         from app.services.mcp.servers.mcp_installer import MCPInstaller
         installer = MCPInstaller()
         
-        # 在后台运行异步检查
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-        result = loop.run_until_complete(installer.check_and_install_required_services(tools_needed))
-        loop.close()
+        # 在后台事件循环中运行异步检查
+        result = run_coroutine(installer.check_and_install_required_services(tools_needed))
         
         return jsonify({
             "success": True,
@@ -450,11 +429,8 @@ def check_single_service_installation(service_name):
         from app.services.mcp.servers.mcp_installer import MCPInstaller
         installer = MCPInstaller()
         
-        # 在后台运行异步检查
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-        result = loop.run_until_complete(installer.check_single_service(service_name))
-        loop.close()
+        # 在后台事件循环中运行异步检查
+        result = run_coroutine(installer.check_single_service(service_name))
         
         return jsonify({
             "success": True,
@@ -475,11 +451,8 @@ def install_single_service(service_name):
         from app.services.mcp.servers.mcp_installer import MCPInstaller
         installer = MCPInstaller()
         
-        # 在后台运行异步安装
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-        result = loop.run_until_complete(installer.install_single_service(service_name))
-        loop.close()
+        # 在后台事件循环中运行异步安装
+        result = run_coroutine(installer.install_single_service(service_name))
         
         return jsonify({
             "success": result["success"],
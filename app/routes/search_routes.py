@@ -1,20 +1,278 @@
 import os
+import io
+import re
 import json
 import time
+import uuid
+import atexit
 import logging
-from flask import Blueprint, request, jsonify
-from sqlalchemy import or_, and_, desc
+import threading
+import functools
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from operator import itemgetter
+import numpy as np
+from flask import Blueprint, request, jsonify, Response, stream_with_context, current_app
+from sqlalchemy import or_, and_, desc, func, case
+from sqlalchemy.orm import selectinload, load_only
 from app.models.document_models import DocumentNode, db
-from app.services.vectorization.vector_service_adapter import VectorServiceAdapter
-from app.services.llm import LLMService
+from app.services.vectorization.vector_service_adapter import get_vector_service, get_configured_vector_service
+from app.services.vectorization.search_cache import get_index_generation, get_search_result_cache_stats
+from app.services.vectorization.base_vectorizer import get_query_vector_cache_stats
+from app.services.llm import LLMService, FallbackAnswer
+from app.services.llm.cache import LLMResultCache, content_hash, normalize_query, get_llm_cache
+from app.services.mcp_intent import detect_and_execute_mcp, call_tools_in_waves
+from app.services.mcp_tool_analyzer import create_mcp_tool_analyzer
+from app.services.mcp.servers.mcp_manager import get_mcp_manager, ensure_mcp_initialized
+from app.services.mcp.event_loop import run_coroutine
 # 旧的MCP服务已移除
 from config import Config
-import asyncio
 
 logger = logging.getLogger(__name__)
 
 search_bp = Blueprint('search', __name__)
 
+# LLM答案生成上下文：使用前5个文件，每个文件最多3个片段，单个片段最多1500字符
+ANSWER_CONTEXT_MAX_FILES = 5
+ANSWER_CONTEXT_MAX_CHUNKS = 3
+ANSWER_CONTEXT_CHUNK_MAX_CHARS = 1500
+
+# 文件级聚合结果中每个chunk保留的字段；search_similar/search_by_keywords的结果均包含这些字段，
+# search_type由merge_and_aggregate或aggregate_results_by_file补齐
+FILE_CHUNK_FIELDS = ('chunk_id', 'text', 'score', 'search_type')
+_chunk_fields = itemgetter(*FILE_CHUNK_FIELDS)
+_chunk_score = itemgetter('score')
+
+# 搜索类型位掩码：按文件汇总search_types时用整数或运算代替逐chunk构建集合
+SEARCH_TYPE_NAMES = ('semantic', 'keyword', 'hybrid', 'unknown')
+_SEARCH_TYPE_BITS = {name: 1 << i for i, name in enumerate(SEARCH_TYPE_NAMES)}
+_UNKNOWN_SEARCH_TYPE_BIT = _SEARCH_TYPE_BITS['unknown']
+
+def _collect_search_types(chunks):
+    """汇总一组chunk的搜索类型，按SEARCH_TYPE_NAMES的固定顺序返回"""
+    mask = 0
+    for chunk in chunks:
+        mask |= _SEARCH_TYPE_BITS.get(chunk['search_type'], _UNKNOWN_SEARCH_TYPE_BIT)
+    return [name for i, name in enumerate(SEARCH_TYPE_NAMES) if mask >> i & 1]
+
+# 搜索辅助线程池（提交的任务只访问LLM或Milvus，不访问数据库会话，可在工作线程中执行）
+_llm_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix='search-llm')
+_search_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix='search-vector')
+
+def _shutdown_executors():
+    """进程退出时关闭线程池，取消尚未开始的任务"""
+    for executor in (_llm_executor, _search_executor):
+        executor.shutdown(wait=False, cancel_futures=True)
+
+atexit.register(_shutdown_executors)
+
+# 查询文本中的URL
+_URL_RE = re.compile(r'https?://[^\s]+')
+
+# 不超过该长度的查询（如人名、简称）直接用于检索，不经过LLM关键词提取
+SIMPLE_QUERY_MAX_LENGTH = 4
+
+def _needs_keyword_extraction(query_text):
+    """判断查询是否值得调用LLM提取关键词
+    
+    URL、单个英文单词/编号（无空白的ASCII串）和很短的查询本身就是检索关键词，LLM提取无收益。
+    """
+    query_text = query_text.strip()
+    if len(query_text) <= SIMPLE_QUERY_MAX_LENGTH or _URL_RE.fullmatch(query_text):
+        return False
+    if query_text.isascii() and not any(ch.isspace() for ch in query_text):
+        return False
+    return True
+
+def _submit_keyword_extraction(query_text, llm_model, intent_enabled):
+    """在意图分析开始前提交关键词提取任务，使两次LLM调用并行
+
+    仅在即将进行意图分析时提交，否则返回None由调用方同步提取。
+    """
+    if not (llm_model and intent_enabled and Config.ENABLE_PARALLEL_KEYWORD_EXTRACTION):
+        return None
+    if not _needs_keyword_extraction(query_text):
+        return None
+    return _llm_executor.submit(LLMService.extract_search_keywords, query_text, llm_model)
+
+def _cancel_keyword_extraction(keyword_future):
+    """意图为聊天/MCP操作等无需检索时取消关键词提取任务（已开始执行的任务无法取消，其结果被丢弃）"""
+    if keyword_future is not None:
+        keyword_future.cancel()
+
+# 单独出现时没有检索意义的停用词（查询整体或按空白切分后的每个词都在其中时跳过语义检索）
+SEMANTIC_STOPWORDS = frozenset((
+    '的', '了', '是', '在', '和', '与', '或', '吗', '呢', '啊', '吧', '这', '那', '这个', '那个',
+    '什么', '怎么', '哪里', '哪个', '请问', '一下', '你好', '您好',
+    'a', 'an', 'the', 'of', 'and', 'or', 'to', 'in', 'on', 'is', 'are', 'what', 'how', 'hi', 'hello'
+))
+
+def _should_semantic_search(query_text, min_score):
+    """判断查询是否值得进行语义检索
+    
+    设置了相似度阈值时，单字符查询或仅由停用词组成的查询几乎不可能有结果达到阈值，
+    跳过可省去一次嵌入推理和Milvus请求（常见于输入联想场景）。
+    """
+    if not Config.ENABLE_SEMANTIC_QUERY_PREFILTER or min_score <= 0:
+        return True
+    query_text = query_text.strip().casefold()
+    if len(query_text) < 2:
+        return False
+    return not all(token in SEMANTIC_STOPWORDS for token in query_text.split())
+
+# 混合搜索相似度级别对应的最低得分
+SIMILARITY_THRESHOLDS = {'high': 0.6, 'medium': 0.3, 'low': 0.1, 'any': 0.0}
+# 包含这些词的查询（银行等金融类）提高最低阈值
+STRICT_THRESHOLD_TOKENS = ('银行', '金融机构', '贷款')
+# 包含这些操作词的短查询不按人名等专有名词处理
+ACTION_QUERY_TOKENS = ('创建', '新建', '帮我', '找到', '搜索')
+
+def _message_meta():
+    """标准化响应消息的ID和时间戳（两者取自同一时刻，跨秒边界时也保持一致）
+    
+    消息ID以秒级时间戳开头（保持按时间排序），后接随机部分，同一秒内的并发请求不会冲突。
+    """
+    now = int(time.time())
+    return {
+        "message_id": f"msg-{now}-{uuid.uuid4().hex[:12]}",
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(now))
+    }
+
+def _assistant_message(content, legacy_data=None):
+    """构建标准化的助手响应消息（消息ID、时间戳、角色、内容，可选的兼容旧格式数据）"""
+    message = {**_message_meta(), "role": "assistant", "content": content}
+    if legacy_data is not None:
+        message["legacy_data"] = legacy_data
+    return message
+
+# 搜索接口响应缓存：键为(接口, 规范化查询, 其余请求参数摘要, 向量数据版本号)，
+# 值为不含消息ID/时间戳的标准化响应
+_search_response_cache = LLMResultCache(
+    max_size=Config.SEARCH_RESPONSE_CACHE_MAX_SIZE,
+    ttl=Config.SEARCH_RESPONSE_CACHE_TTL
+) if Config.ENABLE_SEARCH_RESPONSE_CACHE else None
+
+def _search_response_cache_key(endpoint, data):
+    """构建搜索响应缓存键"""
+    params = {key: value for key, value in data.items() if key != 'query'}
+    return (
+        endpoint,
+        normalize_query(data.get('query')),
+        content_hash(json.dumps(params, sort_keys=True, ensure_ascii=False, default=str)),
+        get_index_generation()
+    )
+
+def _get_cached_search_response(cache_key, query_text):
+    """命中缓存时返回响应（重新生成消息ID和时间戳），否则返回None"""
+    if _search_response_cache is None:
+        return None
+    cached = _search_response_cache.get(cache_key)
+    if cached is None:
+        return None
+    logger.info(f"搜索响应缓存命中: {query_text}")
+    return jsonify({
+        'success': True,
+        'data': {**_message_meta(), **cached}
+    })
+
+def _llm_stage_succeeded(llm_model, file_results, llm_answer, with_answer):
+    """LLM阶段是否成功完成：未启用LLM、无结果或不生成答案时视为成功；
+    需要答案时，答案生成失败（返回None或降级提示文本）则不应缓存该响应，下次请求重新调用LLM"""
+    if not llm_model or not file_results or not with_answer or not Config.ENABLE_LLM_ANSWER_GENERATION:
+        return True
+    return bool(llm_answer) and not isinstance(llm_answer, FallbackAnswer)
+
+def _cache_search_response(cache_key, standardized_response):
+    """写入搜索响应缓存"""
+    if _search_response_cache is not None:
+        _search_response_cache.set(cache_key, {
+            key: value for key, value in standardized_response.items()
+            if key not in ('message_id', 'timestamp')
+        })
+
+# 搜索统计结果短时间缓存，统计数据变化不频繁，无需每次请求都查询数据库和Milvus
+SEARCH_STATS_CACHE_TTL = 30
+_search_stats_cache = {'value': None, 'expires_at': 0.0}
+
+# 各搜索接口最近 SEARCH_LATENCY_WINDOW 次请求的耗时（秒），用于 /stats 中的延迟统计
+SEARCH_LATENCY_WINDOW = 500
+_search_latencies = {}
+_search_latency_lock = threading.Lock()
+
+def _record_search_latency(endpoint, seconds, failed):
+    """记录一次搜索请求的耗时"""
+    with _search_latency_lock:
+        entry = _search_latencies.get(endpoint)
+        if entry is None:
+            entry = _search_latencies[endpoint] = {
+                'samples': deque(maxlen=SEARCH_LATENCY_WINDOW), 'count': 0, 'errors': 0
+            }
+        entry['samples'].append(seconds)
+        entry['count'] += 1
+        if failed:
+            entry['errors'] += 1
+
+def get_search_latency_stats():
+    """获取各搜索接口的请求数、失败数与最近请求的耗时分位数（毫秒）"""
+    with _search_latency_lock:
+        snapshot = {endpoint: (sorted(entry['samples']), entry['count'], entry['errors'])
+                    for endpoint, entry in _search_latencies.items()}
+    
+    stats = {}
+    for endpoint, (samples, count, errors) in snapshot.items():
+        stats[endpoint] = {
+            'count': count,
+            'errors': errors,
+            'avg_ms': round(sum(samples) / len(samples) * 1000, 1),
+            'p50_ms': round(samples[len(samples) // 2] * 1000, 1),
+            'p95_ms': round(samples[min(len(samples) - 1, int(len(samples) * 0.95))] * 1000, 1),
+            'max_ms': round(samples[-1] * 1000, 1)
+        }
+    return stats
+
+def search_endpoint(label):
+    """搜索接口装饰器：统一记录耗时，并处理视图中未捕获的异常
+    
+    视图抛出ValueError时返回400，其他异常返回500，响应格式与各接口一致。
+    """
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            failed = False
+            try:
+                response = view(*args, **kwargs)
+                failed = isinstance(response, tuple) and len(response) > 1 and response[1] >= 400
+                return response
+            except ValueError as e:
+                failed = True
+                return jsonify({
+                    'success': False,
+                    'error': str(e)
+                }), 400
+            except Exception as e:
+                failed = True
+                logger.error(f"{label}失败: {str(e)}")
+                return jsonify({
+                    'success': False,
+                    'error': str(e)
+                }), 500
+            finally:
+                _record_search_latency(view.__name__, time.perf_counter() - start, failed)
+        return wrapper
+    return decorator
+
+def _name_match_clause(query):
+    """文档名称模糊匹配条件
+    
+    启用全文索引时使用 MATCH ... AGAINST（ngram短语匹配，效果等同于子串匹配），
+    否则退回 LIKE '%query%'。ngram最小分词长度为2，单字查询仍使用LIKE。
+    """
+    if Config.ENABLE_NAME_FULLTEXT_SEARCH and len(query) >= 2 and db.engine.dialect.name == 'mysql':
+        phrase = '"{}"'.format(query.replace('"', ' '))
+        return DocumentNode.name.match(phrase)
+    return DocumentNode.name.contains(query)
+
 @search_bp.route('/create-folder', methods=['POST'])
 def create_folder():
     """创建文件夹（MCP功能）"""
@@ -30,9 +288,6 @@ def create_folder():
             }), 400
         
         # 创建文件夹
-        from app.models import DocumentNode
-        from app import db
-        
         new_folder = DocumentNode(
             name=folder_name,
             type='folder',
@@ -62,886 +317,805 @@ def create_folder():
             'error': str(e)
         }), 500
 
+def _intent_summary(intent_analysis, **extra):
+    """响应中返回的意图分析摘要；cache_hit表示意图分析结果是否来自缓存（未调用LLM）"""
+    return {
+        'intent_type': intent_analysis.get('intent_type'),
+        'confidence': intent_analysis.get('confidence'),
+        'action_type': intent_analysis.get('action_type'),
+        'reasoning': intent_analysis.get('reasoning'),
+        'used_llm': True,
+        'cache_hit': intent_analysis.get('cache_hit', False),
+        **extra
+    }
+
+def _collect_mcp_tool_result(tool_name, tool_arguments, result, message_content, mcp_results):
+    """将一次MCP工具调用的结果（MCPToolResult或异常）同时写入响应内容和mcp_results"""
+    try:
+        if isinstance(result, Exception):
+            raise result
+        
+        if result.isError:
+            error_msg = result.content[0].get('text', 'Unknown error') if result.content else 'Unknown error'
+            logger.error(f"工具 {tool_name} 执行失败: {error_msg}")
+            error_text = f"❌ 工具 {tool_name} 执行失败: {error_msg}"
+        else:
+            tool_output = result.content[0].get('text', '操作完成') if result.content else '操作完成'
+            logger.info(f"工具 {tool_name} 执行成功: {tool_output}")
+            message_content.append({
+                "type": "tool_call",
+                "data": {
+                    "tool": tool_name,
+                    "params": tool_arguments,
+                    "result": tool_output,
+                    "user_visible": True
+                }
+            })
+            mcp_results.append({
+                'tool_name': tool_name,
+                'arguments': tool_arguments,
+                'result': tool_output,
+                'error': None,
+                'timestamp': time.time()
+            })
+            return
+    except Exception as tool_error:
+        logger.error(f"执行工具 {tool_name} 异常: {tool_error}")
+        error_text = f"❌ 工具 {tool_name} 执行异常: {str(tool_error)}"
+    
+    message_content.append({
+        "type": "text",
+        "data": error_text
+    })
+    mcp_results.append({
+        'tool_name': tool_name,
+        'arguments': tool_arguments,
+        'result': None,
+        'error': error_text,
+        'timestamp': time.time()
+    })
+
+def _load_document_infos(doc_ids):
+    """批量加载文档信息（一次IN查询）
+    
+    只查询需要的列（跳过ORM对象构建），每个文档的信息字典只构建一次，由其各个片段共享。
+    """
+    if not doc_ids:
+        return {}
+    return {
+        str(doc_id): {
+            'id': doc_id,
+            'name': name,
+            'file_type': file_type,
+            'file_size': file_size,
+            'created_at': created_at.isoformat() if created_at else None,
+            'description': description
+        }
+        for doc_id, name, file_type, file_size, created_at, description in db.session.query(
+            DocumentNode.id, DocumentNode.name, DocumentNode.file_type,
+            DocumentNode.file_size, DocumentNode.created_at, DocumentNode.description
+        ).filter(
+            DocumentNode.id.in_(doc_ids),
+            DocumentNode.is_deleted == False
+        ).all()
+    }
+
+def _enrich_semantic_results(raw_results, documents):
+    """为语义检索结果原地补充document等字段，丢弃文档已删除的结果"""
+    search_results = []
+    for result in raw_results:
+        document_id = result.get('document_id')
+        if document_id:
+            document = documents.get(str(document_id))
+            if document:
+                # 为每个结果添加完整的document对象
+                result['id'] = result['chunk_id'] = result.get('chunk_id') or ''
+                result.setdefault('text', '')
+                result.setdefault('score', 0)
+                result['search_type'] = 'semantic'  # 添加搜索类型标识
+                result['document'] = document
+                search_results.append(result)
+    return search_results
+
 @search_bp.route('/', methods=['POST'])
+@search_endpoint('语义搜索')
 def semantic_search():
     """语义搜索接口"""
-    try:
-        data = request.get_json()
-        
-        if not data:
-            return jsonify({
-                'success': False,
-                'error': '请求数据为空'
-            }), 400
-        
-        query_text = data.get('query', '').strip()
-        top_k = data.get('top_k', 10)
-        enable_mcp = data.get('enable_mcp', False)
-        
-        if not query_text:
-            return jsonify({
-                'success': False,
-                'error': '查询内容不能为空'
-            }), 400
-        
-        llm_model = data.get('llm_model')  # 获取LLM模型参数
-        
-        logger.info(f"接收到语义搜索请求: {query_text}, top_k: {top_k}, enable_mcp: {enable_mcp}, llm_model: {llm_model}")
-        
-        # 初始化结果
-        search_results = []
-        mcp_tool_results = []
-        skip_search = False
-        intent_analysis = None
-        
-        # 使用专用的意图识别模型进行智能意图分析
-        if Config.ENABLE_INTENT_ANALYSIS and enable_mcp:
-            try:
-                from app.services.llm import LLMService
-                # 使用专用的意图识别模型
-                intent_llm_model = f"{Config.INTENT_ANALYSIS_LLM_PROVIDER}:{Config.INTENT_ANALYSIS_LLM_MODEL}"
-                intent_analysis = LLMService.analyze_user_intent(query_text, intent_llm_model)
-                logger.info(f"意图分析结果: {intent_analysis}")
-                
-                # 使用配置的置信度阈值
-                confidence_threshold = Config.INTENT_ANALYSIS_CONFIDENCE_THRESHOLD
-                intent_type = intent_analysis.get('intent_type', 'knowledge_search')
-                confidence = intent_analysis.get('confidence', 0)
+    data = request.get_json()
+    
+    if not data:
+        raise ValueError('请求数据为空')
+    
+    query_text = data.get('query', '').strip()
+    top_k = data.get('top_k', 10)
+    enable_mcp = data.get('enable_mcp', False)
+    
+    if not query_text:
+        raise ValueError('查询内容不能为空')
+    
+    llm_model = data.get('llm_model')  # 获取LLM模型参数
+    # 前端改用 /answer/stream 流式获取答案时，检索接口不再同步生成答案
+    defer_answer = data.get('defer_answer', False)
+    
+    logger.info(f"接收到语义搜索请求: {query_text}, top_k: {top_k}, enable_mcp: {enable_mcp}, llm_model: {llm_model}")
+    
+    # 相同查询参数的重复请求直接返回缓存的响应
+    cache_key = _search_response_cache_key('semantic', data)
+    cached_response = _get_cached_search_response(cache_key, query_text)
+    if cached_response is not None:
+        return cached_response
+    
+    # 初始化结果
+    search_results = []
+    mcp_tool_results = []
+    skip_search = False
+    intent_analysis = None
+    
+    # 关键词提取与意图分析并行执行
+    keyword_future = _submit_keyword_extraction(query_text, llm_model, Config.ENABLE_INTENT_ANALYSIS and enable_mcp)
+    
+    # 使用专用的意图识别模型进行智能意图分析
+    if Config.ENABLE_INTENT_ANALYSIS and enable_mcp:
+        try:
+            # 使用专用的意图识别模型
+            intent_llm_model = f"{Config.INTENT_ANALYSIS_LLM_PROVIDER}:{Config.INTENT_ANALYSIS_LLM_MODEL}"
+            intent_analysis = LLMService.analyze_user_intent(query_text, intent_llm_model)
+            logger.info(f"意图分析结果: {intent_analysis}")
+            
+            # 使用配置的置信度阈值
+            confidence_threshold = Config.INTENT_ANALYSIS_CONFIDENCE_THRESHOLD
+            intent_type = intent_analysis.get('intent_type', 'knowledge_search')
+            confidence = intent_analysis.get('confidence', 0)
+            
+            # 根据新的意图分类处理
+            if intent_type == 'normal_chat' and confidence > confidence_threshold:
+                # 普通聊天：直接LLM问答
+                logger.info(f"执行普通聊天操作: {query_text}")
+                skip_search = True
+                _cancel_keyword_extraction(keyword_future)
                 
-                # 根据新的意图分类处理
-                if intent_type == 'normal_chat' and confidence > confidence_threshold:
-                    # 普通聊天：直接LLM问答
-                    logger.info(f"执行普通聊天操作: {query_text}")
-                    skip_search = True
+                try:
+                    # 使用用户选择的LLM模型进行聊天
+                    chat_response = LLMService.generate_answer(
+                        query=query_text,
+                        context="",  # 普通聊天不需要文档上下文
+                        llm_model=llm_model or intent_llm_model,
+                        style="conversational"
+                    )
+                    logger.info(f"普通聊天响应生成完成")
                     
-                    try:
-                        # 使用用户选择的LLM模型进行聊天
-                        chat_response = LLMService.generate_answer(
-                            query=query_text,
-                            context="",  # 普通聊天不需要文档上下文
-                            llm_model=llm_model or intent_llm_model,
-                            style="conversational"
+                    # 构建聊天响应数据
+                    response_data = {
+                        'query': query_text,
+                        'is_chat': True,
+                        'chat_response': chat_response,
+                        'search_type': 'normal_chat',
+                        'intent_analysis': _intent_summary(
+                            intent_analysis,
+                            model=llm_model or intent_llm_model,
+                            prompt_source=intent_analysis.get('prompt_source', 'config_file'),
+                            confidence_threshold=confidence_threshold
                         )
-                        logger.info(f"普通聊天响应生成完成")
-                        
-                        # 构建聊天响应数据
-                        response_data = {
-                            'query': query_text,
-                            'is_chat': True,
-                            'chat_response': chat_response,
-                            'search_type': 'normal_chat',
-                            'intent_analysis': {
-                                'intent_type': intent_analysis.get('intent_type'),
-                                'confidence': intent_analysis.get('confidence'),
-                                'action_type': intent_analysis.get('action_type'),
-                                'reasoning': intent_analysis.get('reasoning'),
-                                'used_llm': True,
-                                'model': llm_model or intent_llm_model,
-                                'prompt_source': intent_analysis.get('prompt_source', 'config_file'),
-                                'confidence_threshold': confidence_threshold
-                            }
-                        }
-                        
-                        # 转换为标准化消息格式
-                        message_content = []
-                        
-                        # 添加意图识别结果
-                        message_content.append({
-                            "type": "text", 
-                            "data": f"💬 普通对话: {intent_analysis.get('reasoning', '已识别为一般对话交流')}"
-                        })
-                        
-                        # 添加聊天响应
-                        message_content.append({
-                            "type": "markdown",
-                            "data": chat_response
-                        })
-                        
-                        # 构建标准化响应格式
-                        standardized_response = {
-                            "message_id": f"msg-{int(time.time())}-{hash(query_text) % 1000:03d}",
-                            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
-                            "role": "assistant",
-                            "content": message_content,
-                            "legacy_data": response_data
-                        }
-                        
-                        return jsonify({
-                            'success': True,
-                            'data': standardized_response
-                        })
-                        
-                    except Exception as chat_error:
-                        logger.error(f"普通聊天处理失败: {chat_error}")
-                        return jsonify({
-                            'success': False,
-                            'error': f"聊天处理失败: {str(chat_error)}"
-                        }), 500
+                    }
+                    
+                    # 转换为标准化消息格式
+                    message_content = []
+                    
+                    # 添加意图识别结果
+                    message_content.append({
+                        "type": "text", 
+                        "data": f"💬 普通对话: {intent_analysis.get('reasoning', '已识别为一般对话交流')}"
+                    })
+                    
+                    # 添加聊天响应
+                    message_content.append({
+                        "type": "markdown",
+                        "data": chat_response
+                    })
+                    
+                    # 构建标准化响应格式
+                    standardized_response = _assistant_message(message_content, legacy_data=response_data)
+                    
+                    return jsonify({
+                        'success': True,
+                        'data': standardized_response
+                    })
+                    
+                except Exception as chat_error:
+                    logger.error(f"普通聊天处理失败: {chat_error}")
+                    return jsonify({
+                        'success': False,
+                        'error': f"聊天处理失败: {str(chat_error)}"
+                    }), 500
+            
+            elif intent_type == 'mcp_action' and confidence > confidence_threshold:
+                # MCP调用：使用标准MCP系统
+                logger.info(f"执行标准MCP操作: {query_text}")
+                skip_search = True
+                _cancel_keyword_extraction(keyword_future)
                 
-                elif intent_type == 'mcp_action' and confidence > confidence_threshold:
-                    # MCP调用：使用标准MCP系统
-                    logger.info(f"执行标准MCP操作: {query_text}")
-                    skip_search = True
+                # 步骤1：检查MCP开关状态
+                if not enable_mcp:
+                    logger.warning("MCP功能已关闭")
                     
-                    # 步骤1：检查MCP开关状态
-                    mcp_enabled = request.json.get('enable_mcp', False)
-                    if not mcp_enabled:
-                        logger.warning("MCP功能已关闭")
-                        
+                    message_content = [{
+                        "type": "text",
+                        "data": "⚠️ MCP功能已关闭，无法执行MCP工具操作\n💡 请在设置中启用MCP功能后重试"
+                    }]
+                    
+                    standardized_response = _assistant_message(message_content)
+                    
+                    return jsonify({'success': True, 'data': standardized_response})
+                
+                # 步骤2：使用标准MCP系统分析和执行工具
+                try:
+                    # 使用全局MCP管理器（客户端连接跨请求复用），未初始化时初始化
+                    mcp_manager = get_mcp_manager()
+                    if not ensure_mcp_initialized():
                         message_content = [{
                             "type": "text",
-                            "data": "⚠️ MCP功能已关闭，无法执行MCP工具操作\n💡 请在设置中启用MCP功能后重试"
+                            "data": "❌ MCP系统初始化失败，无法执行工具操作"
                         }]
                         
-                        standardized_response = {
-                            "message_id": f"msg-{int(time.time())}-{hash(query_text) % 1000:03d}",
-                            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
-                            "role": "assistant",
-                            "content": message_content
-                        }
+                        standardized_response = _assistant_message(message_content)
                         
                         return jsonify({'success': True, 'data': standardized_response})
                     
-                    # 步骤2：使用标准MCP系统分析和执行工具
-                    try:
-                        from app.services.mcp.servers.mcp_manager import MCPManager
-                        from app.services.mcp_tool_analyzer import create_mcp_tool_analyzer
-                        
-                        # 创建MCP管理器实例
-                        mcp_manager = MCPManager()
-                        
-                        # 初始化MCP系统（如果未初始化）
-                        if not mcp_manager.is_initialized:
-                            loop = asyncio.new_event_loop()
-                            asyncio.set_event_loop(loop)
-                            init_success = loop.run_until_complete(mcp_manager.initialize())
-                            loop.close()
-                            
-                            if not init_success:
-                                message_content = [{
-                                    "type": "text",
-                                    "data": "❌ MCP系统初始化失败，无法执行工具操作"
-                                }]
-                                
-                                standardized_response = {
-                                    "message_id": f"msg-{int(time.time())}-{hash(query_text) % 1000:03d}",
-                                    "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
-                                    "role": "assistant",
-                                    "content": message_content
-                                }
-                                
-                                return jsonify({'success': True, 'data': standardized_response})
-                        
-                        # 创建带有MCP管理器的工具分析器
-                        mcp_tool_analyzer = create_mcp_tool_analyzer(mcp_manager)
-                        
-                        # 使用LLM分析需要的工具
-                        tool_analysis = mcp_tool_analyzer.analyze_tools_needed(query_text)
-                        logger.info(f"工具分析结果: {tool_analysis}")
-                        
-                        # 获取分析的工具列表
-                        tools_needed = tool_analysis.get('tools_needed', [])
-                        if not tools_needed:
-                            message_content = [{
-                                "type": "text",
-                                "data": "❌ 未能识别出需要执行的具体工具"
-                            }]
-                        else:
-                            # 执行工具序列
-                            message_content = []
-                            
-                            # 添加工具分析结果
-                            message_content.append({
-                                "type": "text",
-                                "data": f"🎯 识别为MCP操作: {intent_analysis.get('reasoning', '已识别为MCP操作')}"
-                            })
-                            
-                            if tool_analysis.get('reasoning'):
-                                message_content.append({
-                                    "type": "text",
-                                    "data": f"🔧 工具分析: {tool_analysis['reasoning']}"
-                                })
-                            
-                            # 按执行序列执行工具，确保所有工具都能执行
-                            execution_sequence = tool_analysis.get('execution_sequence', [])
-                            if execution_sequence:
-                                # 按序列执行
-                                for step in execution_sequence:
-                                    tool_name = step.get('tool_name')
-                                    tool_arguments = step.get('parameters', {})
-                                    
-                                    if not tool_name:
-                                        continue
-                                        
-                                    try:
-                                        logger.info(f"执行工具: {tool_name}, 参数: {tool_arguments}")
-                                        
-                                        # 调用标准MCP工具
-                                        loop = asyncio.new_event_loop()
-                                        asyncio.set_event_loop(loop)
-                                        result = loop.run_until_complete(
-                                            mcp_manager.call_tool(tool_name, tool_arguments)
-                                        )
-                                        loop.close()
-                                        
-                                        # 处理执行结果
-                                        if result.isError:
-                                            error_msg = result.content[0].get('text', 'Unknown error') if result.content else 'Unknown error'
-                                            logger.error(f"工具 {tool_name} 执行失败: {error_msg}")
-                                            message_content.append({
-                                                "type": "text",
-                                                "data": f"❌ 工具 {tool_name} 执行失败: {error_msg}"
-                                            })
-                                        else:
-                                            # 成功执行
-                                            tool_output = result.content[0].get('text', '操作完成') if result.content else '操作完成'
-                                            logger.info(f"工具 {tool_name} 执行成功: {tool_output}")
-                                            message_content.append({
-                                                "type": "tool_call",
-                                                "data": {
-                                                    "tool": tool_name,
-                                                    "params": tool_arguments,
-                                                    "result": tool_output,
-                                                    "user_visible": True
-                                                }
-                                            })
-                                            
-                                    except Exception as tool_error:
-                                        logger.error(f"执行工具 {tool_name} 异常: {tool_error}")
-                                        message_content.append({
-                                            "type": "text",
-                                            "data": f"❌ 工具 {tool_name} 执行异常: {str(tool_error)}"
-                                        })
-                            else:
-                                # 降级到按工具列表执行
-                                for tool_name in tools_needed:
-                                    try:
-                                        logger.info(f"降级执行工具: {tool_name}")
-                                        
-                                        # 调用标准MCP工具
-                                        loop = asyncio.new_event_loop()
-                                        asyncio.set_event_loop(loop)
-                                        result = loop.run_until_complete(
-                                            mcp_manager.call_tool(tool_name, {})
-                                        )
-                                        loop.close()
-                                        
-                                        # 处理执行结果
-                                        if result.isError:
-                                            error_msg = result.content[0].get('text', 'Unknown error') if result.content else 'Unknown error'
-                                            message_content.append({
-                                                "type": "text",
-                                                "data": f"❌ 工具 {tool_name} 执行失败: {error_msg}"
-                                            })
-                                        else:
-                                            # 成功执行
-                                            tool_output = result.content[0].get('text', '操作完成') if result.content else '操作完成'
-                                            message_content.append({
-                                                "type": "tool_call",
-                                                "data": {
-                                                    "tool": tool_name,
-                                                    "params": {},
-                                                    "result": tool_output,
-                                                    "user_visible": True
-                                                }
-                                            })
-                                            
-                                    except Exception as tool_error:
-                                        logger.error(f"执行工具 {tool_name} 失败: {tool_error}")
-                                        message_content.append({
-                                            "type": "text",
-                                            "data": f"❌ 工具 {tool_name} 执行异常: {str(tool_error)}"
-                                        })
-                        
-                        # 收集所有工具执行结果
-                        mcp_results = []
-                        for i, content_item in enumerate(message_content):
-                            if content_item.get("type") == "tool_call":
-                                mcp_results.append({
-                                    'tool_name': content_item["data"]["tool"],
-                                    'arguments': content_item["data"]["params"],
-                                    'result': content_item["data"]["result"],
-                                    'error': None,
-                                    'timestamp': time.time()
-                                })
-                            elif content_item.get("type") == "text" and "❌" in content_item.get("data", ""):
-                                # 处理失败的工具调用
-                                tool_name = tools_needed[0] if tools_needed else "unknown"
-                                mcp_results.append({
-                                    'tool_name': tool_name,
-                                    'arguments': {},
-                                    'result': None,
-                                    'error': content_item["data"],
-                                    'timestamp': time.time()
-                                })
-                        
-                        # 构建标准化响应格式
-                        standardized_response = {
-                            "message_id": f"msg-{int(time.time())}-{hash(query_text) % 1000:03d}",
-                            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
-                            "role": "assistant",
-                            "content": message_content,
-                            "legacy_data": {
-                                'query': query_text,
-                                'search_type': 'mcp_action',
-                                'intent_analysis': intent_analysis,
-                                'tool_analysis': tool_analysis,
-                                'mcp_system': 'standard',
-                                'mcp_results': mcp_results
-                            }
-                        }
-                        
-                        return jsonify({
-                            'success': True,
-                            'data': standardized_response
-                        })
-                        
-                    except Exception as mcp_error:
-                        logger.error(f"标准MCP系统执行失败: {mcp_error}")
-                        
-                        # 错误情况也返回标准化格式
+                    # 获取绑定全局MCP管理器的共享工具分析器
+                    mcp_tool_analyzer = create_mcp_tool_analyzer(mcp_manager)
+                    
+                    # 使用LLM分析需要的工具
+                    tool_analysis = mcp_tool_analyzer.analyze_tools_needed(query_text)
+                    logger.info(f"工具分析结果: {tool_analysis}")
+                    
+                    # 获取分析的工具列表
+                    tools_needed = tool_analysis.get('tools_needed', [])
+                    if not tools_needed:
                         message_content = [{
                             "type": "text",
-                            "data": f"❌ MCP操作失败: {str(mcp_error)}"
+                            "data": "❌ 未能识别出需要执行的具体工具"
                         }]
+                        mcp_results = [{
+                            'tool_name': 'unknown',
+                            'arguments': {},
+                            'result': None,
+                            'error': message_content[0]["data"],
+                            'timestamp': time.time()
+                        }]
+                    else:
+                        # 执行工具序列；每个工具的结果同时写入响应内容和mcp_results
+                        message_content = []
+                        mcp_results = []
                         
-                        standardized_response = {
-                            "message_id": f"msg-{int(time.time())}-{hash(query_text) % 1000:03d}",
-                            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
-                            "role": "assistant",
-                            "content": message_content,
-                            "legacy_data": {'error': str(mcp_error)}
-                        }
-                        
-                        return jsonify({
-                            'success': True,
-                            'data': standardized_response
+                        # 添加工具分析结果
+                        message_content.append({
+                            "type": "text",
+                            "data": f"🎯 识别为MCP操作: {intent_analysis.get('reasoning', '已识别为MCP操作')}"
                         })
                         
-                elif intent_type == 'document_generation' and confidence > confidence_threshold:
-                    # 文档生成：基于现有文件/文件夹生成新文档
-                    logger.info(f"执行文档生成操作: {query_text}")
-                    skip_search = True
-                    
-                    try:
-                        from app.services.document_generation_service import DocumentGenerationService
-                        from app.services.intent_service import intent_service
-                        
-                        # 分析用户查询，提取参数（使用LLM增强的参数提取）
-                        action_type, parameters = intent_service._determine_action_and_parameters('document_generation', query_text)
-                        
-                        source_path = parameters.get('source_path', '')
-                        output_format = parameters.get('output_format', 'txt')
-                        document_type = parameters.get('document_type', 'summary')
+                        if tool_analysis.get('reasoning'):
+                            message_content.append({
+                                "type": "text",
+                                "data": f"🔧 工具分析: {tool_analysis['reasoning']}"
+                            })
                         
-                        logger.info(f"参数提取结果 - 源路径: '{source_path}', 输出格式: {output_format}, 文档类型: {document_type}")
+                        # 按执行序列执行工具，确保所有工具都能执行
+                        execution_sequence = tool_analysis.get('execution_sequence', [])
+                        if execution_sequence:
+                            # 按序列执行：互不依赖的步骤在后台事件循环中并发调用，结果按原顺序处理
+                            step_results = run_coroutine(call_tools_in_waves(mcp_manager, execution_sequence))
+                            for step, result in zip(execution_sequence, step_results):
+                                if step.get('tool_name'):
+                                    _collect_mcp_tool_result(step['tool_name'], step.get('parameters', {}), result,
+                                                             message_content, mcp_results)
+                        else:
+                            # 降级到按工具列表执行
+                            for tool_name in tools_needed:
+                                logger.info(f"降级执行工具: {tool_name}")
+                                try:
+                                    result = run_coroutine(mcp_manager.call_tool(tool_name, {}))
+                                except Exception as tool_error:
+                                    result = tool_error
+                                _collect_mcp_tool_result(tool_name, {}, result, message_content, mcp_results)
+                    
+                    # 构建标准化响应格式
+                    standardized_response = _assistant_message(message_content, legacy_data={
+                        'query': query_text,
+                        'search_type': 'mcp_action',
+                        'intent_analysis': intent_analysis,
+                        'tool_analysis': tool_analysis,
+                        'mcp_system': 'standard',
+                        'mcp_results': mcp_results
+                    })
+                    
+                    return jsonify({
+                        'success': True,
+                        'data': standardized_response
+                    })
+                    
+                except Exception as mcp_error:
+                    logger.error(f"标准MCP系统执行失败: {mcp_error}")
+                    
+                    # 错误情况也返回标准化格式
+                    message_content = [{
+                        "type": "text",
+                        "data": f"❌ MCP操作失败: {str(mcp_error)}"
+                    }]
+                    
+                    standardized_response = _assistant_message(message_content, legacy_data={'error': str(mcp_error)})
+                    
+                    return jsonify({
+                        'success': True,
+                        'data': standardized_response
+                    })
+                    
+            elif intent_type == 'document_generation' and confidence > confidence_threshold:
+                # 文档生成：基于现有文件/文件夹生成新文档
+                logger.info(f"执行文档生成操作: {query_text}")
+                skip_search = True
+                _cancel_keyword_extraction(keyword_future)
+                
+                try:
+                    from app.services.document_generation_service import DocumentGenerationService
+                    from app.services.intent_service import intent_service
+                    
+                    # 分析用户查询，提取参数（使用LLM增强的参数提取）
+                    action_type, parameters = intent_service._determine_action_and_parameters('document_generation', query_text)
+                    
+                    source_path = parameters.get('source_path', '')
+                    output_format = parameters.get('output_format', 'txt')
+                    document_type = parameters.get('document_type', 'summary')
+                    
+                    logger.info(f"参数提取结果 - 源路径: '{source_path}', 输出格式: {output_format}, 文档类型: {document_type}")
+                    
+                    if not source_path:
+                        # 源路径为空，尝试智能检索相关文档
+                        logger.info("源路径为空，尝试智能检索相关文档")
                         
-                        if not source_path:
-                            # 源路径为空，尝试智能检索相关文档
-                            logger.info("源路径为空，尝试智能检索相关文档")
+                        try:
+                            # 1. 使用用户查询作为搜索关键词
+                            search_keywords = query_text
                             
-                            try:
-                                # 1. 使用用户查询作为搜索关键词
-                                search_keywords = query_text
-                                
-                                # 2. 执行向量检索
-                                vector_service = VectorServiceAdapter()
-                                raw_search_results = vector_service.search_similar(
-                                    query_text=search_keywords,
-                                    top_k=15,  # 多检索一些候选
-                                    min_score=0.3  # 设置合理的相似度阈值
-                                )
+                            # 2. 执行向量检索
+                            vector_service = get_vector_service()
+                            raw_search_results = vector_service.search_similar(
+                                query_text=search_keywords,
+                                top_k=15,  # 多检索一些候选
+                                min_score=0.3  # 设置合理的相似度阈值
+                            )
+                            
+                            if raw_search_results:
+                                # 3. 聚合为文件级结果
+                                file_results = aggregate_results_by_file(raw_search_results)
                                 
-                                if raw_search_results:
-                                    # 3. 聚合为文件级结果
-                                    file_results = aggregate_results_by_file(raw_search_results)
+                                if file_results:
+                                    # 4. 使用检索到的文档内容生成文档
+                                    generation_result = DocumentGenerationService.generate_from_search_results(
+                                        search_results=file_results,
+                                        output_format=output_format,
+                                        document_type=document_type,
+                                        query_text=query_text,
+                                        llm_model=llm_model,
+                                        search_keywords=search_keywords
+                                    )
                                     
-                                    if file_results:
-                                        # 4. 使用检索到的文档内容生成文档
-                                        generation_result = DocumentGenerationService.generate_from_search_results(
-                                            search_results=file_results,
-                                            output_format=output_format,
-                                            document_type=document_type,
-                                            query_text=query_text,
-                                            llm_model=llm_model,
-                                            search_keywords=search_keywords
-                                        )
-                                        
-                                        logger.info(f"基于搜索结果生成文档完成，成功: {generation_result.get('success')}")
-                                    else:
-                                        generation_result = {
-                                            'success': False,
-                                            'error': '搜索结果聚合失败，无法找到相关文档'
-                                        }
+                                    logger.info(f"基于搜索结果生成文档完成，成功: {generation_result.get('success')}")
                                 else:
                                     generation_result = {
                                         'success': False,
-                                        'error': f'未找到与"{search_keywords}"相关的文档内容'
+                                        'error': '搜索结果聚合失败，无法找到相关文档'
                                     }
-                                    
-                            except Exception as search_error:
-                                logger.error(f"智能检索失败: {search_error}")
+                            else:
                                 generation_result = {
                                     'success': False,
-                                    'error': f'智能检索过程中出现错误: {str(search_error)}'
+                                    'error': f'未找到与"{search_keywords}"相关的文档内容'
                                 }
-                            
-                            # 处理检索生成结果
-                            if generation_result.get('success'):
-                                # 成功生成文档
-                                source_type = generation_result.get('source_type', 'unknown')
-                                source_info = generation_result.get('source_info', {})
-                                source_name = source_info.get('name', '搜索结果')
-                                generated_content = generation_result.get('generated_content', '')
-                                saved_file = generation_result.get('saved_file')
                                 
-                                # 处理生成内容中的超链接
-                                if generated_content:
-                                    try:
-                                        from app.services.preview.text_preview import TextPreviewService
-                                        preview_service = TextPreviewService()
-                                        processed_content = preview_service._process_hyperlinks(generated_content)
-                                    except Exception as e:
-                                        logger.warning(f"处理超链接失败: {e}")
-                                        processed_content = generated_content
-                                else:
+                        except Exception as search_error:
+                            logger.error(f"智能检索失败: {search_error}")
+                            generation_result = {
+                                'success': False,
+                                'error': f'智能检索过程中出现错误: {str(search_error)}'
+                            }
+                        
+                        # 处理检索生成结果
+                        if generation_result.get('success'):
+                            # 成功生成文档
+                            source_type = generation_result.get('source_type', 'unknown')
+                            source_info = generation_result.get('source_info', {})
+                            source_name = source_info.get('name', '搜索结果')
+                            generated_content = generation_result.get('generated_content', '')
+                            saved_file = generation_result.get('saved_file')
+                            
+                            # 处理生成内容中的超链接
+                            if generated_content:
+                                try:
+                                    from app.services.preview.text_preview import TextPreviewService
+                                    preview_service = TextPreviewService()
+                                    processed_content = preview_service._process_hyperlinks(generated_content)
+                                except Exception as e:
+                                    logger.warning(f"处理超链接失败: {e}")
                                     processed_content = generated_content
+                            else:
+                                processed_content = generated_content
+                            
+                            message_content = [
+                                {
+                            "type": "text",
+                                    "data": f"🔍 智能检索到相关内容，基于{source_type} '{source_name}' 成功生成{DocumentGenerationService.DOCUMENT_TYPES.get(document_type, '文档')}"
+                                },
+                                {
+                                    "type": "markdown",
+                                    "data": f"## 生成的文档内容\n\n{processed_content}"
+                                }
+                            ]
+                            
+                            if saved_file:
+                                file_link_obj = {
+                                    "text": saved_file['name'],
+                                    "document_id": saved_file.get('id')
+                                }
                                 
-                                message_content = [
-                                    {
-                                "type": "text",
-                                        "data": f"🔍 智能检索到相关内容，基于{source_type} '{source_name}' 成功生成{DocumentGenerationService.DOCUMENT_TYPES.get(document_type, '文档')}"
-                                    },
-                                    {
-                                        "type": "markdown",
-                                        "data": f"## 生成的文档内容\n\n{processed_content}"
-                                    }
-                                ]
-                                
-                                if saved_file:
-                                    file_link_obj = {
-                                        "text": saved_file['name'],
-                                        "document_id": saved_file.get('id')
-                                    }
-                                    
-                                    message_content.append({
-                                        "type": "text",
-                                        "data": "💾 文档已保存为: "
-                                    })
-                                    
-                                    message_content.append({
-                                        "type": "table",
-                                        "data": {
-                                            "headers": ["生成的文档"],
-                                            "rows": [[file_link_obj]]
-                                        }
-                                    })
-                                
-                                # 添加搜索统计信息
-                                files_used = generation_result.get('processed_files_count', 0)
-                                total_found = generation_result.get('total_files_count', 0)
                                 message_content.append({
                                     "type": "text",
-                                    "data": f"📊 搜索统计: 找到 {total_found} 个相关文件，使用 {files_used} 个文件生成文档"
+                                    "data": "💾 文档已保存为: "
                                 })
-                            else:
-                                # 检索生成失败，返回友好的错误提示
-                                error_msg = generation_result.get('error', '未知错误')
-                                message_content = [
-                                    {
-                                        "type": "text",
-                                        "data": f"🔍 智能检索未找到相关内容\n\n❌ {error_msg}\n\n💡 您可以尝试：\n• 更具体地描述要生成的文档内容\n• 明确指定源文件或文件夹名称\n• 使用更明确的关键词描述"
+                                
+                                message_content.append({
+                                    "type": "table",
+                                    "data": {
+                                        "headers": ["生成的文档"],
+                                        "rows": [[file_link_obj]]
                                     }
-                                ]
+                                })
+                            
+                            # 添加搜索统计信息
+                            files_used = generation_result.get('processed_files_count', 0)
+                            total_found = generation_result.get('total_files_count', 0)
+                            message_content.append({
+                                "type": "text",
+                                "data": f"📊 搜索统计: 找到 {total_found} 个相关文件，使用 {files_used} 个文件生成文档"
+                            })
                         else:
-                            # 调用文档生成服务
-                            generation_result = DocumentGenerationService.generate_document(
-                                source_path=source_path,
-                                output_format=output_format,
-                                document_type=document_type,
-                                query_text=query_text,
-                                llm_model=llm_model
-                            )
+                            # 检索生成失败，返回友好的错误提示
+                            error_msg = generation_result.get('error', '未知错误')
+                            message_content = [
+                                {
+                                    "type": "text",
+                                    "data": f"🔍 智能检索未找到相关内容\n\n❌ {error_msg}\n\n💡 您可以尝试：\n• 更具体地描述要生成的文档内容\n• 明确指定源文件或文件夹名称\n• 使用更明确的关键词描述"
+                                }
+                            ]
+                    else:
+                        # 调用文档生成服务
+                        generation_result = DocumentGenerationService.generate_document(
+                            source_path=source_path,
+                            output_format=output_format,
+                            document_type=document_type,
+                            query_text=query_text,
+                            llm_model=llm_model
+                        )
+                        
+                        if generation_result.get('success'):
+                            # 成功生成文档
+                            source_type = generation_result.get('source_type', 'unknown')
+                            source_name = generation_result.get('source_info', {}).get('name', source_path)
+                            generated_content = generation_result.get('generated_content', '')
+                            saved_file = generation_result.get('saved_file')
                             
-                            if generation_result.get('success'):
-                                # 成功生成文档
-                                source_type = generation_result.get('source_type', 'unknown')
-                                source_name = generation_result.get('source_info', {}).get('name', source_path)
-                                generated_content = generation_result.get('generated_content', '')
-                                saved_file = generation_result.get('saved_file')
-                                
-                                # 处理生成内容中的超链接（基于记忆中的实现）
-                                if generated_content:
-                                    # 调用TextPreviewService处理超链接
-                                    try:
-                                        from app.services.preview.text_preview import TextPreviewService
-                                        preview_service = TextPreviewService()
-                                        processed_content = preview_service._process_hyperlinks(generated_content)
-                                    except Exception as e:
-                                        logger.warning(f"处理超链接失败: {e}")
-                                        processed_content = generated_content
-                                else:
+                            # 处理生成内容中的超链接（基于记忆中的实现）
+                            if generated_content:
+                                # 调用TextPreviewService处理超链接
+                                try:
+                                    from app.services.preview.text_preview import TextPreviewService
+                                    preview_service = TextPreviewService()
+                                    processed_content = preview_service._process_hyperlinks(generated_content)
+                                except Exception as e:
+                                    logger.warning(f"处理超链接失败: {e}")
                                     processed_content = generated_content
+                            else:
+                                processed_content = generated_content
+                            
+                            message_content = [
+                                {
+                                    "type": "text", 
+                                    "data": f"📄 基于{source_type} '{source_name}' 成功生成{DocumentGenerationService.DOCUMENT_TYPES.get(document_type, '文档')}"
+                                },
+                                {
+                                    "type": "markdown",
+                                    "data": f"## 生成的文档内容\n\n{processed_content}"
+                                }
+                            ]
+                            
+                            if saved_file:
+                                # 为保存的文件名创建可点击链接（基于现有实现）
+                                file_link_obj = {
+                                    "text": saved_file['name'],
+                                    "document_id": saved_file.get('id')
+                                }
                                 
-                                message_content = [
-                                    {
-                                        "type": "text", 
-                                        "data": f"📄 基于{source_type} '{source_name}' 成功生成{DocumentGenerationService.DOCUMENT_TYPES.get(document_type, '文档')}"
-                                    },
-                                    {
-                                        "type": "markdown",
-                                        "data": f"## 生成的文档内容\n\n{processed_content}"
-                                    }
-                                ]
+                                message_content.append({
+                                    "type": "text",
+                                    "data": "💾 文档已保存为: "
+                                })
                                 
-                                if saved_file:
-                                    # 为保存的文件名创建可点击链接（基于现有实现）
-                                    file_link_obj = {
-                                        "text": saved_file['name'],
-                                        "document_id": saved_file.get('id')
+                                # 添加文件链接表格（使用现有的表格链接机制）
+                                message_content.append({
+                                    "type": "table",
+                                    "data": {
+                                        "headers": ["生成的文档"],
+                                        "rows": [[file_link_obj]]
                                     }
-                                    
-                                    message_content.append({
-                                        "type": "text",
-                                        "data": "💾 文档已保存为: "
-                                    })
-                                    
-                                    # 添加文件链接表格（使用现有的表格链接机制）
-                                    message_content.append({
-                                        "type": "table",
-                                        "data": {
-                                            "headers": ["生成的文档"],
-                                            "rows": [[file_link_obj]]
-                                        }
-                                    })
-                                
-                                # 添加统计信息
-                                if source_type == 'folder':
-                                    processed_count = generation_result.get('processed_files_count', 0)
-                                    total_count = generation_result.get('total_files_count', 0)
-                                    message_content.append({
-                                        "type": "text",
-                                        "data": f"📊 处理统计: 成功处理 {processed_count}/{total_count} 个文件"
-                                    })
-                            else:
-                                # 生成失败
-                                error_msg = generation_result.get('error', '未知错误')
-                                message_content = [{
+                                })
+                            
+                            # 添加统计信息
+                            if source_type == 'folder':
+                                processed_count = generation_result.get('processed_files_count', 0)
+                                total_count = generation_result.get('total_files_count', 0)
+                                message_content.append({
                                     "type": "text",
-                                    "data": f"❌ 文档生成失败: {error_msg}"
-                                }]
-                        
-                        # 构建标准化响应
-                        standardized_response = {
-                            "message_id": f"msg-{int(time.time())}-{hash(query_text) % 1000:03d}",
-                            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
-                            "role": "assistant",
-                            "content": message_content,
-                            "legacy_data": {
-                                'intent_analysis': intent_analysis,
-                                'generation_result': generation_result if 'generation_result' in locals() else None,
-                                'query': query_text,
-                                'search_type': 'document_generation'
-                            }
-                        }
-                        
-                        # 如果文档生成成功，添加树刷新标识
-                        if 'generation_result' in locals() and generation_result.get('success') and generation_result.get('saved_file'):
-                            standardized_response['tree_refresh'] = True
-                            logger.info("文档生成成功，已标记需要刷新文档树")
-                        
-                        return jsonify({
-                            'success': True,
-                            'data': standardized_response
-                        })
-                        
-                    except Exception as doc_gen_error:
-                        logger.error(f"文档生成失败: {doc_gen_error}")
-                        
-                        # 错误情况也返回标准化格式
-                        message_content = [{
-                            "type": "text",
-                            "data": f"❌ 文档生成操作失败: {str(doc_gen_error)}"
-                        }]
-                        
-                        standardized_response = {
-                            "message_id": f"msg-{int(time.time())}-{hash(query_text) % 1000:03d}",
-                            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
-                            "role": "assistant",
-                            "content": message_content,
-                            "legacy_data": {'error': str(doc_gen_error)}
-                        }
-                        
-                        return jsonify({
-                            'success': True,
-                            'data': standardized_response
-                        })
-                
-                # 对于 knowledge_search 意图，继续执行向量检索（不需要特殊处理）
-                elif intent_type == 'knowledge_search':
-                    logger.info(f"执行知识库检索操作: {query_text}")
-                    # 继续向下执行语义搜索逻辑
-                    pass
-                else:
-                    # 置信度不够或未识别的意图，默认执行知识库检索
-                    logger.info(f"意图不明确或置信度不足，执行默认知识库检索: {query_text}")
-                        
-            except Exception as e:
-                logger.error(f"意图分析失败: {e}")
-                # 降级到知识库检索
-                intent_analysis = {
-                    "intent_type": "knowledge_search",
-                    "confidence": 0.5,
-                    "reasoning": f"意图分析失败，降级到知识库检索: {str(e)}",
-                    "used_llm": False,
-                    "error": str(e),
-                    "model_used": f"{Config.INTENT_ANALYSIS_LLM_PROVIDER}:{Config.INTENT_ANALYSIS_LLM_MODEL}",
-                    "prompt_source": "config_file"
-                }
-        
-        # 只有在没有特殊处理时才执行语义搜索（知识库检索）
-        if not skip_search:
-            try:
-                # 进行关键词提取以优化搜索
-                keyword_extraction = None
-                search_query = query_text  # 默认使用原查询
-                
-                if llm_model:
-                    try:
+                                    "data": f"📊 处理统计: 成功处理 {processed_count}/{total_count} 个文件"
+                                })
+                        else:
+                            # 生成失败
+                            error_msg = generation_result.get('error', '未知错误')
+                            message_content = [{
+                                "type": "text",
+                                "data": f"❌ 文档生成失败: {error_msg}"
+                            }]
+                    
+                    # 构建标准化响应
+                    standardized_response = _assistant_message(message_content, legacy_data={
+                        'intent_analysis': intent_analysis,
+                        'generation_result': generation_result if 'generation_result' in locals() else None,
+                        'query': query_text,
+                        'search_type': 'document_generation'
+                    })
+                    
+                    # 如果文档生成成功，添加树刷新标识
+                    if 'generation_result' in locals() and generation_result.get('success') and generation_result.get('saved_file'):
+                        standardized_response['tree_refresh'] = True
+                        logger.info("文档生成成功，已标记需要刷新文档树")
+                    
+                    return jsonify({
+                        'success': True,
+                        'data': standardized_response
+                    })
+                    
+                except Exception as doc_gen_error:
+                    logger.error(f"文档生成失败: {doc_gen_error}")
+                    
+                    # 错误情况也返回标准化格式
+                    message_content = [{
+                        "type": "text",
+                        "data": f"❌ 文档生成操作失败: {str(doc_gen_error)}"
+                    }]
+                    
+                    standardized_response = _assistant_message(message_content, legacy_data={'error': str(doc_gen_error)})
+                    
+                    return jsonify({
+                        'success': True,
+                        'data': standardized_response
+                    })
+            
+            # 对于 knowledge_search 意图，继续执行向量检索（不需要特殊处理）
+            elif intent_type == 'knowledge_search':
+                logger.info(f"执行知识库检索操作: {query_text}")
+                # 继续向下执行语义搜索逻辑
+                pass
+            else:
+                # 置信度不够或未识别的意图，默认执行知识库检索
+                logger.info(f"意图不明确或置信度不足，执行默认知识库检索: {query_text}")
+                    
+        except Exception as e:
+            logger.error(f"意图分析失败: {e}")
+            # 降级到知识库检索
+            intent_analysis = {
+                "intent_type": "knowledge_search",
+                "confidence": 0.5,
+                "reasoning": f"意图分析失败，降级到知识库检索: {str(e)}",
+                "used_llm": False,
+                "error": str(e),
+                "model_used": f"{Config.INTENT_ANALYSIS_LLM_PROVIDER}:{Config.INTENT_ANALYSIS_LLM_MODEL}",
+                "prompt_source": "config_file"
+            }
+    
+    # 只有在没有特殊处理时才执行语义搜索（知识库检索）
+    if not skip_search:
+        try:
+            # 进行关键词提取以优化搜索
+            keyword_extraction = None
+            search_query = query_text  # 默认使用原查询
+            
+            if llm_model and _needs_keyword_extraction(query_text):
+                try:
+                    if keyword_future is not None:
+                        keyword_extraction = keyword_future.result()
+                    else:
                         keyword_extraction = LLMService.extract_search_keywords(query_text, llm_model)
-                        search_query = keyword_extraction.get('optimized_query', query_text)
-                        logger.info(f"关键词提取完成 - 原查询: {query_text}, 优化查询: {search_query}")
-                    except Exception as e:
-                        logger.warning(f"关键词提取失败，使用原查询: {e}")
-                        search_query = query_text
-                
-                # 设置合理的相似度阈值（避免返回太多低质量结果）
-                min_score = 0.2  # 语义搜索的默认最低相似度阈值
-                
-                # 对人名等专有名词查询适当降低阈值
-                if len(search_query.strip().split()) <= 2 and not any(word in search_query.lower() for word in ['创建', '新建', '帮我', '找到', '搜索']):
-                    min_score = 0.15  # 简短查询（如人名）降低阈值
-                    logger.info(f"检测到简短查询，降低相似度阈值到: {min_score}")
-                
-                # 使用优化后的查询进行向量搜索
-                vector_service = VectorServiceAdapter()
+                    search_query = keyword_extraction.get('optimized_query', query_text)
+                    logger.info(f"关键词提取完成 - 原查询: {query_text}, 优化查询: {search_query}")
+                except Exception as e:
+                    logger.warning(f"关键词提取失败，使用原查询: {e}")
+                    search_query = query_text
+            
+            # 设置合理的相似度阈值（避免返回太多低质量结果）
+            min_score = 0.2  # 语义搜索的默认最低相似度阈值
+            
+            # 对人名等专有名词查询适当降低阈值
+            if len(search_query.strip().split()) <= 2 and not any(word in search_query for word in ACTION_QUERY_TOKENS):
+                min_score = 0.15  # 简短查询（如人名）降低阈值
+                logger.info(f"检测到简短查询，降低相似度阈值到: {min_score}")
+            
+            # 使用优化后的查询进行向量搜索（无意义的查询直接返回空结果）
+            if _should_semantic_search(search_query, min_score):
+                vector_service = get_vector_service()
                 raw_results = vector_service.search_similar(
                     query_text=search_query, 
                     top_k=top_k,
                     min_score=min_score
                 )
-                
-                # 补充文档信息，确保前端能正确显示结果
-                search_results = []
-                for result in raw_results:
-                    document_id = result.get('document_id')
-                    if document_id:
-                        document = DocumentNode.query.get(document_id)
-                        if document and not document.is_deleted:
-                            # 为每个结果添加完整的document对象
-                            enriched_result = {
-                                'id': result.get('chunk_id', ''),
-                                'document_id': document_id,
-                                'chunk_id': result.get('chunk_id', ''),
-                                'text': result.get('text', ''),
-                                'score': result.get('score', 0),
-                                'search_type': 'semantic',  # 添加搜索类型标识
-                                'document': {
-                                    'id': document.id,
-                                    'name': document.name,
-                                    'file_type': document.file_type,
-                                    'file_size': document.file_size,
-                                    'created_at': document.created_at.isoformat() if document.created_at else None,
-                                    'description': document.description
-                                }
-                            }
-                            search_results.append(enriched_result)
-                
-                logger.info(f"语义搜索完成，找到 {len(search_results)} 个结果")
-                
-                # 如果有LLM模型，进行结果聚合和智能分析
-                file_results = []
-                llm_answer = None
-                reranked = False
-                
-                if llm_model and search_results:
-                    try:
-                        # 将chunk级别结果聚合为文件级别（复用混合搜索的聚合逻辑）
-                        file_results = aggregate_results_by_file(search_results)
-                        
-                        # LLM结果重排序
-                        if file_results:
-                            try:
-                                file_results = LLMService.rerank_file_results(query_text, file_results, llm_model)
-                                reranked = True
-                                logger.info(f"语义搜索LLM文件结果重排序完成 - 处理了 {len(file_results)} 个文件")
-                            except Exception as e:
-                                logger.warning(f"语义搜索LLM结果重排序失败: {e}")
-                        
-                        # LLM智能答案生成
-                        if file_results:
-                            try:
-                                # 准备上下文文本
-                                context_texts = []
-                                for file_result in file_results[:5]:  # 只使用前5个文件结果生成答案
-                                    doc_name = file_result['document']['name']
-                                    # 合并该文件的所有匹配片段
-                                    chunks = [chunk['text'] for chunk in file_result['chunks'][:3]]  # 每个文件最多3个片段
-                                    combined_text = '\n'.join(chunks)
-                                    context_texts.append(f"文档《{doc_name}》：{combined_text}")
-                                
-                                context = '\n\n'.join(context_texts)
-                                llm_answer = LLMService.generate_answer(
-                                    query_text, 
-                                    context, 
-                                    llm_model=llm_model,
-                                    scenario=None,  # 让系统自动分析
-                                    style=None      # 让系统自动推荐
-                                )
-                                logger.info(f"语义搜索智能LLM答案生成完成 - 查询: {query_text}")
-                            except Exception as e:
-                                logger.warning(f"语义搜索LLM答案生成失败: {e}")
-                    except Exception as e:
-                        logger.warning(f"语义搜索LLM处理失败: {e}")
-                
-            except Exception as e:
-                logger.error(f"语义搜索失败: {str(e)}")
-                search_results = []
-                keyword_extraction = None
-                file_results = []
-                llm_answer = None
-                reranked = False
-        
-        # 构建响应数据
-        response_data = {
-            'query': query_text,
-            'results': file_results,
-            'file_results': file_results,  # 保持向后兼容
-            'total_results': len(file_results),
-            'search_type': 'semantic',
-            'similarity_level': 'medium',  # 默认相似度级别
-            'min_score': min_score if not skip_search else 0.0,
-            'optimized_query': search_query if not skip_search else query_text,
-            'original_query': query_text,
-            'reranked': reranked,
-            'mcp_results': mcp_tool_results if mcp_tool_results else [],
-            'llm_info': {
-                'model': llm_model,
-                'answer': llm_answer if 'llm_answer' in locals() else None,
-                'enabled': llm_model is not None
-            } if 'llm_answer' in locals() and llm_answer else None
-        }
-        
-        # 添加意图分析结果
-        if intent_analysis:
-            response_data['intent_analysis'] = {
-                'intent_type': intent_analysis.get('intent_type'),
-                'confidence': intent_analysis.get('confidence'),
-                'action_type': intent_analysis.get('action_type'),
-                'reasoning': intent_analysis.get('reasoning'),
-                'used_llm': True,
-                'model': intent_analysis.get('model_used'),
-                'prompt_source': intent_analysis.get('prompt_source', 'config_file')
-            }
-        
-        # 添加关键词提取信息
-        if 'keyword_extraction' in locals() and keyword_extraction:
-            response_data['keyword_extraction'] = keyword_extraction
-        
-        # 转换为标准化消息格式
-        message_content = []
-        
-        # 1. 添加意图分析结果（如果有）
-        if intent_analysis and intent_analysis.get('confidence', 0) > Config.INTENT_ANALYSIS_CONFIDENCE_THRESHOLD:
-            message_content.append({
-                "type": "text",
-                "data": f"🎯 意图识别: {intent_analysis.get('reasoning', '已识别用户意图')}"
-            })
-        
-        # 2. 添加LLM答案（如果有）
-        if 'llm_answer' in locals() and llm_answer:
-            message_content.append({
-                "type": "markdown",
-                "data": llm_answer
-            })
-        
-        # 3. 添加MCP工具执行结果（如果有）
-        if mcp_tool_results:
-            for mcp_result in mcp_tool_results:
-                # 处理dataclass对象或字典
-                error = getattr(mcp_result, 'error', None) if hasattr(mcp_result, 'error') else mcp_result.get('error') if isinstance(mcp_result, dict) else None
-                if error:
-                    message_content.append({
-                        "type": "text",
-                        "data": f"❌ 工具执行失败: {error}"
-                    })
-                else:
-                    tool_name = getattr(mcp_result, 'tool_name', None) if hasattr(mcp_result, 'tool_name') else mcp_result.get('tool_name', 'unknown') if isinstance(mcp_result, dict) else 'unknown'
-                    arguments = getattr(mcp_result, 'arguments', {}) if hasattr(mcp_result, 'arguments') else mcp_result.get('arguments', {}) if isinstance(mcp_result, dict) else {}
-                    result = getattr(mcp_result, 'result', None) if hasattr(mcp_result, 'result') else mcp_result.get('result') if isinstance(mcp_result, dict) else None
-                    
-                    message_content.append({
-                        "type": "tool_call",
-                        "data": {
-                            "tool": tool_name,
-                            "params": arguments,
-                            "result": result,
-                            "user_visible": True
-                        }
-                    })
-        
-        # 4. 添加搜索结果表格（如果有文件结果）
-        if file_results:
-            # 构建搜索结果表格
-            table_headers = ["文档", "相关度", "搜索类型", "内容预览"]
-            table_rows = []
+            else:
+                logger.info(f"查询过短或仅包含停用词，跳过语义检索: {search_query}")
+                raw_results = []
             
-            for file_result in file_results[:5]:  # 限制显示前5个结果
-                document = file_result.get('document', {})
-                
-                # 计算平均相关度
-                score = file_result.get('score', 0)
-                score_display = f"{score:.2f}" if score > 0 else "N/A"
-                
-                # 搜索类型
-                search_types = file_result.get('search_types', ['unknown'])
-                search_type_display = "+".join(search_types)
-                
-                # 内容预览（使用最佳chunk）
-                chunks = file_result.get('chunks', [])
-                content_preview = chunks[0].get('text', '')[:100] + "..." if chunks else "无预览"
-                
-                # 创建可点击的文件名（带文档ID用于前端点击处理）
-                file_name_with_link = {
-                    "text": document.get('name', '未知文档'),
-                    "document_id": document.get('id')
-                }
-                
-                table_rows.append([
-                    file_name_with_link,
-                    score_display,
-                    search_type_display,
-                    content_preview
-                ])
+            # 补充文档信息，确保前端能正确显示结果（一次IN查询批量加载，避免逐条查询）
+            doc_ids = {int(result['document_id']) for result in raw_results
+                       if str(result.get('document_id') or '').isdigit()}
+            documents = _load_document_infos(doc_ids)
             
-            if table_rows:
+            # search_similar返回的结果字典归本次请求所有（命中缓存时也是副本），直接原地补充字段
+            search_results = _enrich_semantic_results(raw_results, documents)
+            
+            logger.info(f"语义搜索完成，找到 {len(search_results)} 个结果")
+            
+            # 如果有LLM模型，进行结果聚合和智能分析
+            file_results = []
+            llm_answer = None
+            reranked = False
+            
+            if llm_model and search_results:
+                try:
+                    # 将chunk级别结果聚合为文件级别（复用混合搜索的聚合逻辑）
+                    file_results = aggregate_results_by_file(search_results)
+                    
+                    # LLM结果重排序与智能答案生成
+                    if file_results:
+                        file_results, reranked, llm_answer = rerank_and_generate_answer(
+                            query_text, file_results, llm_model,
+                            with_answer=not defer_answer, search_label='语义搜索'
+                        )
+                except Exception as e:
+                    logger.warning(f"语义搜索LLM处理失败: {e}")
+            
+        except Exception as e:
+            logger.error(f"语义搜索失败: {str(e)}")
+            search_results = []
+            keyword_extraction = None
+            file_results = []
+            llm_answer = None
+            reranked = False
+    
+    # 构建响应数据
+    response_data = {
+        'query': query_text,
+        'results': file_results,
+        'file_results': file_results,  # 保持向后兼容
+        'total_results': len(file_results),
+        'search_type': 'semantic',
+        'similarity_level': 'medium',  # 默认相似度级别
+        'min_score': min_score if not skip_search else 0.0,
+        'optimized_query': search_query if not skip_search else query_text,
+        'original_query': query_text,
+        'reranked': reranked,
+        'mcp_results': mcp_tool_results if mcp_tool_results else [],
+        'llm_info': {
+            'model': llm_model,
+            'answer': llm_answer if 'llm_answer' in locals() else None,
+            'enabled': llm_model is not None
+        } if 'llm_answer' in locals() and llm_answer else None
+    }
+    
+    # 添加意图分析结果
+    if intent_analysis:
+        response_data['intent_analysis'] = _intent_summary(
+            intent_analysis,
+            model=intent_analysis.get('model_used'),
+            prompt_source=intent_analysis.get('prompt_source', 'config_file')
+        )
+    
+    # 添加关键词提取信息
+    if 'keyword_extraction' in locals() and keyword_extraction:
+        response_data['keyword_extraction'] = keyword_extraction
+    
+    # 转换为标准化消息格式
+    message_content = []
+    
+    # 1. 添加意图分析结果（如果有）
+    if intent_analysis and intent_analysis.get('confidence', 0) > Config.INTENT_ANALYSIS_CONFIDENCE_THRESHOLD:
+        message_content.append({
+            "type": "text",
+            "data": f"🎯 意图识别: {intent_analysis.get('reasoning', '已识别用户意图')}"
+        })
+    
+    # 2. 添加LLM答案（如果有）
+    if 'llm_answer' in locals() and llm_answer:
+        message_content.append({
+            "type": "markdown",
+            "data": llm_answer
+        })
+    
+    # 3. 添加MCP工具执行结果（如果有）
+    if mcp_tool_results:
+        for mcp_result in mcp_tool_results:
+            error = mcp_result.get('error')
+            if error:
                 message_content.append({
-                    "type": "table",
+                    "type": "text",
+                    "data": f"❌ 工具执行失败: {error}"
+                })
+            else:
+                message_content.append({
+                    "type": "tool_call",
                     "data": {
-                        "headers": table_headers,
-                        "rows": table_rows
+                        "tool": mcp_result.get('tool_name', 'unknown'),
+                        "params": mcp_result.get('arguments', {}),
+                        "result": mcp_result.get('result'),
+                        "user_visible": True
                     }
                 })
-        
-        # 6. 如果没有找到结果，添加建议
-        if not file_results and not mcp_tool_results:
+    
+    # 4. 添加搜索结果表格（如果有文件结果）
+    if file_results:
+        # 构建搜索结果表格
+        table_headers = ["文档", "相关度", "搜索类型", "内容预览"]
+        table_rows = []
+        
+        for file_result in file_results[:5]:  # 限制显示前5个结果
+            document = file_result.get('document', {})
+            
+            # 计算平均相关度
+            score = file_result.get('score', 0)
+            score_display = f"{score:.2f}" if score > 0 else "N/A"
+            
+            # 搜索类型
+            search_types = file_result.get('search_types', ['unknown'])
+            search_type_display = "+".join(search_types)
+            
+            # 内容预览（使用最佳chunk）
+            chunks = file_result.get('chunks', [])
+            content_preview = chunks[0].get('text', '')[:100] + "..." if chunks else "无预览"
+            
+            # 创建可点击的文件名（带文档ID用于前端点击处理）
+            file_name_with_link = {
+                "text": document.get('name', '未知文档'),
+                "document_id": document.get('id')
+            }
+            
+            table_rows.append([
+                file_name_with_link,
+                score_display,
+                search_type_display,
+                content_preview
+            ])
+        
+        if table_rows:
             message_content.append({
-                "type": "text",
-                "data": "😔 未找到相关内容，建议："
+                "type": "table",
+                "data": {
+                    "headers": table_headers,
+                    "rows": table_rows
+                }
             })
-            message_content.append({
-                "type": "markdown",
-                "data": f"""
+    
+    # 6. 如果没有找到结果，添加建议
+    if not file_results and not mcp_tool_results:
+        message_content.append({
+            "type": "text",
+            "data": "😔 未找到相关内容，建议："
+        })
+        message_content.append({
+            "type": "markdown",
+            "data": f"""
 ## 💡 搜索建议
 
 - **调整关键词**: 尝试使用更具体的词汇
@@ -952,133 +1126,135 @@ def semantic_search():
 **原始查询**: `{query_text}`  
 **优化查询**: `{search_query if not skip_search else query_text}`
 """
-            })
-        
-        # 构建标准化响应格式
-        standardized_response = {
-            "message_id": f"msg-{int(time.time())}-{hash(query_text) % 1000:03d}",
-            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
-            "role": "assistant",
-            "content": message_content,
-            # 保持原有数据结构以确保向后兼容
-            "legacy_data": response_data
-        }
-        
-        return jsonify({
-            'success': True,
-            'data': standardized_response
         })
-        
-    except Exception as e:
-        logger.error(f"语义搜索请求处理失败: {str(e)}")
-        return jsonify({
-            'success': False,
-            'error': f'搜索失败: {str(e)}'
-        }), 500
+    
+    # 构建标准化响应格式
+    standardized_response = _assistant_message(message_content, legacy_data=response_data)
+    
+    # 只缓存普通检索结果：跳过检索（聊天/MCP操作）、无结果（可能为检索服务暂时不可用）
+    # 或LLM答案生成失败时不缓存
+    if (not skip_search and not mcp_tool_results and search_results and
+            _llm_stage_succeeded(llm_model, file_results, llm_answer, not defer_answer)):
+        _cache_search_response(cache_key, standardized_response)
+    
+    return jsonify({
+        'success': True,
+        'data': standardized_response
+    })
 
 @search_bp.route('/documents', methods=['GET'])
+@search_endpoint('文档搜索')
 def search_documents():
     """文档名称搜索"""
-    try:
-        query = request.args.get('q', '').strip()
-        file_type = request.args.get('type')
-        parent_id = request.args.get('parent_id', type=int)
-        
-        if not query:
-            return jsonify({
-                'success': False,
-                'error': '查询参数不能为空'
-            }), 400
-        
-        # 构建查询
-        db_query = DocumentNode.query.filter_by(is_deleted=False)
-        
-        # 按名称模糊搜索
-        db_query = db_query.filter(DocumentNode.name.contains(query))
-        
-        # 按文件类型过滤
-        if file_type:
-            db_query = db_query.filter_by(file_type=file_type)
-        
-        # 按父目录过滤
-        if parent_id is not None:
-            db_query = db_query.filter_by(parent_id=parent_id)
-        
-        # 执行查询
-        documents = db_query.order_by(DocumentNode.type.desc(), DocumentNode.name).limit(50).all()
-        
-        results = [doc.to_dict() for doc in documents]
-        
-        return jsonify({
-            'success': True,
-            'data': {
-                'query': query,
-                'total_results': len(results),
-                'results': results
-            }
-        })
-        
-    except Exception as e:
-        logger.error(f"文档搜索失败: {str(e)}")
-        return jsonify({
-            'success': False,
-            'error': str(e)
-        }), 500
+    query = request.args.get('q', '').strip()
+    file_type = request.args.get('type')
+    parent_id = request.args.get('parent_id', type=int)
+    
+    if not query:
+        raise ValueError('查询参数不能为空')
+    
+    # 构建查询
+    db_query = DocumentNode.query.filter_by(is_deleted=False)
+    
+    # 按名称模糊搜索
+    db_query = db_query.filter(_name_match_clause(query))
+    
+    # 按文件类型过滤
+    if file_type:
+        db_query = db_query.filter_by(file_type=file_type)
+    
+    # 按父目录过滤
+    if parent_id is not None:
+        db_query = db_query.filter_by(parent_id=parent_id)
+    
+    # 执行查询（to_dict会访问tags，预加载避免逐条懒加载）
+    documents = db_query.options(
+        selectinload(DocumentNode.tags)
+    ).order_by(DocumentNode.type.desc(), DocumentNode.name).limit(50).all()
+    
+    results = [doc.to_dict() for doc in documents]
+    
+    return jsonify({
+        'success': True,
+        'data': {
+            'query': query,
+            'total_results': len(results),
+            'results': results
+        }
+    })
 
 @search_bp.route('/suggest', methods=['GET'])
+@search_endpoint('搜索建议')
 def search_suggestions():
     """搜索建议"""
-    try:
-        query = request.args.get('q', '').strip()
-        limit = request.args.get('limit', 10, type=int)
-        
-        if not query or len(query) < 2:
-            return jsonify({
-                'success': True,
-                'data': []
-            })
-        
-        # 查询匹配的文档名称
-        documents = DocumentNode.query.filter(
-            DocumentNode.name.contains(query),
-            DocumentNode.is_deleted == False
-        ).limit(limit).all()
-        
-        suggestions = []
-        for doc in documents:
-            suggestions.append({
-                'id': doc.id,
-                'name': doc.name,
-                'type': doc.type,
-                'file_type': doc.file_type
-            })
-        
+    query = request.args.get('q', '').strip()
+    limit = request.args.get('limit', 10, type=int)
+    
+    if not query or len(query) < 2:
         return jsonify({
             'success': True,
-            'data': suggestions
+            'data': []
         })
-        
-    except Exception as e:
-        logger.error(f"搜索建议失败: {str(e)}")
-        return jsonify({
-            'success': False,
-            'error': str(e)
-        }), 500
+    
+    # 查询匹配的文档名称（只取需要的列，跳过ORM对象构建）
+    rows = db.session.query(
+        DocumentNode.id,
+        DocumentNode.name,
+        DocumentNode.type,
+        DocumentNode.file_type
+    ).filter(
+        _name_match_clause(query),
+        DocumentNode.is_deleted == False
+    ).limit(limit).all()
+    
+    suggestions = [
+        {
+            'id': doc_id,
+            'name': name,
+            'type': node_type,
+            'file_type': file_type
+        }
+        for doc_id, name, node_type, file_type in rows
+    ]
+    
+    return jsonify({
+        'success': True,
+        'data': suggestions
+    })
 
 @search_bp.route('/stats', methods=['GET'])
 def search_stats():
     """搜索统计信息 - 优化版本，减少不必要的向量服务初始化"""
     try:
-        # 先获取文档统计（不依赖向量服务）
-        total_documents = DocumentNode.query.filter_by(is_deleted=False, type='file').count()
-        total_folders = DocumentNode.query.filter_by(is_deleted=False, type='folder').count()
-        vectorized_documents = DocumentNode.query.filter_by(is_deleted=False, type='file', is_vectorized=True).count()
+        if _search_stats_cache['value'] is not None and _search_stats_cache['expires_at'] >= time.monotonic():
+            return jsonify({
+                'success': True,
+                'data': dict(_search_stats_cache['value'], latency_stats=get_search_latency_stats())
+            })
+        
+        # 先获取文档统计（不依赖向量服务）：一次GROUP BY查询得到各类型数量和已向量化数量
+        rows = db.session.query(
+            DocumentNode.type,
+            DocumentNode.file_type,
+            func.count(DocumentNode.id),
+            func.sum(case((DocumentNode.is_vectorized == True, 1), else_=0))
+        ).filter(
+            DocumentNode.is_deleted == False
+        ).group_by(DocumentNode.type, DocumentNode.file_type).all()
         
-        # 按文件类型统计
+        total_documents = 0
+        total_folders = 0
+        vectorized_documents = 0
         file_type_stats = {}
-        for doc in DocumentNode.query.filter_by(is_deleted=False, type='file').all():
-            file_type = doc.file_type or 'unknown'
-            file_type_stats[file_type] = file_type_stats.get(file_type, 0) + 1
+        for node_type, file_type, count, vectorized_count in rows:
+            if node_type == 'folder':
+                total_folders += count
+            elif node_type == 'file':
+                total_documents += count
+                vectorized_documents += int(vectorized_count or 0)
+                # 按文件类型统计
+                file_type = file_type or 'unknown'
+                file_type_stats[file_type] = file_type_stats.get(file_type, 0) + count
         
         # 基础统计数据（无需向量服务）
         base_stats = {
@@ -1093,7 +1269,7 @@ def search_stats():
         # 尝试获取向量统计（如果失败则使用基础统计）
         try:
             # 只在必要时初始化向量服务
-            vector_service = VectorServiceAdapter()
+            vector_service = get_vector_service()
             vector_stats = vector_service.get_collection_stats()
             base_stats['vector_stats'] = vector_stats
         except Exception as vector_error:
@@ -1106,9 +1282,22 @@ def search_stats():
                 'note': '向量服务暂不可用，显示数据库统计'
             }
         
+        # 各级缓存的命中情况
+        llm_cache = get_llm_cache()
+        base_stats['cache_stats'] = {
+            'query_vectors': get_query_vector_cache_stats(),
+            'search_results': get_search_result_cache_stats(),
+            'search_responses': _search_response_cache.get_stats() if _search_response_cache is not None else None,
+            'llm_results': llm_cache.get_stats() if llm_cache is not None else None
+        }
+        
+        _search_stats_cache['value'] = base_stats
+        _search_stats_cache['expires_at'] = time.monotonic() + SEARCH_STATS_CACHE_TTL
+        
+        # 接口延迟统计实时计算，不随其他统计一起缓存
         return jsonify({
             'success': True,
-            'data': base_stats
+            'data': dict(base_stats, latency_stats=get_search_latency_stats())
         })
         
     except Exception as e:
@@ -1119,420 +1308,351 @@ def search_stats():
         }), 500
 
 @search_bp.route('/hybrid', methods=['POST'])
+@search_endpoint('混合搜索')
 def hybrid_search():
     """混合搜索：语义搜索 + 关键词搜索"""
-    try:
-        data = request.get_json()
-        query_text = data.get('query')
-        top_k = data.get('top_k', 10)
-        document_id = data.get('document_id')
-        similarity_level = data.get('similarity_level', 'medium')
-        
-        # LLM相关参数
-        use_llm = data.get('enable_llm', data.get('use_llm', False))  # 兼容两种参数名
-        llm_model = data.get('llm_model')
-        enable_intent_analysis = data.get('enable_intent_analysis', True)
-        
-        logger.info(f"收到混合搜索请求 - query: {query_text}, similarity_level: {similarity_level}, use_llm: {use_llm}, llm_model: {llm_model}")
-        
-        if not query_text:
-            return jsonify({
-                'success': False,
-                'error': '查询文本不能为空'
-            }), 400
-        
-        # 初始化结果变量
-        semantic_results = []
-        keyword_results = []
-        combined_results = []
-        file_results = []
-        mcp_tool_results = []
-        skip_search = False
-        intent_analysis = None
-        
-        # 使用专用的意图识别模型进行智能意图分析
-        if Config.ENABLE_INTENT_ANALYSIS and enable_intent_analysis:
-            try:
-                from app.services.llm import LLMService
-                # 使用专用的意图识别模型
-                intent_llm_model = f"{Config.INTENT_ANALYSIS_LLM_PROVIDER}:{Config.INTENT_ANALYSIS_LLM_MODEL}"
-                intent_analysis = LLMService.analyze_user_intent(query_text, intent_llm_model)
-                logger.info(f"意图分析结果: {intent_analysis}")
+    data = request.get_json()
+    if not data:
+        raise ValueError('请求数据为空')
+    
+    query_text = data.get('query')
+    top_k = data.get('top_k', 10)
+    document_id = data.get('document_id')
+    similarity_level = data.get('similarity_level', 'medium')
+    
+    # LLM相关参数
+    use_llm = data.get('enable_llm', data.get('use_llm', False))  # 兼容两种参数名
+    llm_model = data.get('llm_model')
+    enable_intent_analysis = data.get('enable_intent_analysis', True)
+    # 前端改用 /answer/stream 流式获取答案时，检索接口不再同步生成答案
+    defer_answer = data.get('defer_answer', False)
+    
+    logger.info(f"收到混合搜索请求 - query: {query_text}, similarity_level: {similarity_level}, use_llm: {use_llm}, llm_model: {llm_model}")
+    
+    # 在入口处一次性确定是否走LLM流程，后续各阶段只检查该模型是否为空
+    active_llm_model = llm_model if use_llm else None
+    
+    if not query_text:
+        raise ValueError('查询文本不能为空')
+    
+    # 相同查询参数的重复请求直接返回缓存的响应
+    cache_key = _search_response_cache_key('hybrid', data)
+    cached_response = _get_cached_search_response(cache_key, query_text)
+    if cached_response is not None:
+        return cached_response
+    
+    # 初始化结果变量
+    semantic_results = []
+    keyword_results = []
+    file_results = []
+    mcp_tool_results = []
+    skip_search = False
+    intent_analysis = None
+    keyword_extraction = None
+    original_query = query_text
+    optimized_query = query_text
+    
+    # 关键词提取与意图分析并行执行
+    keyword_future = _submit_keyword_extraction(
+        query_text, active_llm_model, Config.ENABLE_INTENT_ANALYSIS and enable_intent_analysis
+    )
+    
+    # 使用专用的意图识别模型进行智能意图分析
+    if Config.ENABLE_INTENT_ANALYSIS and enable_intent_analysis:
+        try:
+            # 使用专用的意图识别模型
+            intent_llm_model = f"{Config.INTENT_ANALYSIS_LLM_PROVIDER}:{Config.INTENT_ANALYSIS_LLM_MODEL}"
+            intent_analysis = LLMService.analyze_user_intent(query_text, intent_llm_model)
+            logger.info(f"意图分析结果: {intent_analysis}")
+            
+            # 使用配置的置信度阈值
+            confidence_threshold = Config.INTENT_ANALYSIS_CONFIDENCE_THRESHOLD
+            
+            # 根据意图分析结果决定处理方式
+            if (intent_analysis.get('intent_type') == 'folder_analysis' and 
+                intent_analysis.get('confidence', 0) > confidence_threshold and
+                intent_analysis.get('action_type') == 'analyze_folder'):
                 
-                # 使用配置的置信度阈值
-                confidence_threshold = Config.INTENT_ANALYSIS_CONFIDENCE_THRESHOLD
+                logger.info(f"执行文件夹分析操作: {query_text}")
+                skip_search = True
+                _cancel_keyword_extraction(keyword_future)
                 
-                # 根据意图分析结果决定处理方式
-                if (intent_analysis.get('intent_type') == 'folder_analysis' and 
-                    intent_analysis.get('confidence', 0) > confidence_threshold and
-                    intent_analysis.get('action_type') == 'analyze_folder'):
-                    
-                    logger.info(f"执行文件夹分析操作: {query_text}")
-                    skip_search = True
-                    
-                    # 执行文件夹分析
-                    from app.services.folder_analysis_service import FolderAnalysisService
-                    
-                    try:
-                        # 使用用户选择的LLM模型进行分析，而不是意图识别模型
-                        analysis_result = FolderAnalysisService.analyze_folder_completeness(
-                            query_text, llm_model or intent_llm_model, intent_analysis
-                        )
-                        logger.info(f"文件夹分析完成")
-                        
-                        # 构建分析响应
-                        response_data = {
-                            'query': query_text,
-                            'is_analysis': True,
-                            'analysis_result': analysis_result,
-                            'search_type': 'folder_analysis',
-                            'intent_analysis': {
-                                'intent_type': intent_analysis.get('intent_type'),
-                                'confidence': intent_analysis.get('confidence'),
-                                'action_type': intent_analysis.get('action_type'),
-                                'reasoning': intent_analysis.get('reasoning'),
-                                'used_llm': True,
-                                'model': intent_analysis.get('model_used', intent_llm_model),
-                                'prompt_source': intent_analysis.get('prompt_source', 'config_file'),
-                                'confidence_threshold': confidence_threshold
-                            }
-                        }
-                        
-                        return jsonify({
-                            'success': True,
-                            'data': response_data
-                        })
-                        
-                    except Exception as analysis_error:
-                        logger.error(f"文件夹分析失败: {analysis_error}")
-                        return jsonify({
-                            'success': False,
-                            'error': f"文件夹分析失败: {str(analysis_error)}"
-                        }), 500
+                # 执行文件夹分析
+                from app.services.folder_analysis_service import FolderAnalysisService
                 
-                elif (intent_analysis.get('intent_type') == 'mcp_action' and 
-                    intent_analysis.get('confidence', 0) > confidence_threshold and
-                    intent_analysis.get('action_type') in ['create_file', 'create_folder']):
-                    
-                    logger.info(f"执行MCP操作: {query_text}")
-                    skip_search = True
-                    
-                    # 使用完整的MCP工具分析和执行流程
-                    from app.services.mcp_tool_analyzer import create_mcp_tool_analyzer
-                    from app.services.mcp_tool_executor import mcp_tool_executor
+                try:
+                    # 使用用户选择的LLM模型进行分析，而不是意图识别模型
+                    analysis_result = FolderAnalysisService.analyze_folder_completeness(
+                        query_text, llm_model or intent_llm_model, intent_analysis
+                    )
+                    logger.info(f"文件夹分析完成")
                     
-                    # 创建工具分析器实例
-                    mcp_tool_analyzer = create_mcp_tool_analyzer()
+                    # 构建分析响应
+                    response_data = {
+                        'query': query_text,
+                        'is_analysis': True,
+                        'analysis_result': analysis_result,
+                        'search_type': 'folder_analysis',
+                        'intent_analysis': _intent_summary(
+                            intent_analysis,
+                            model=intent_analysis.get('model_used', intent_llm_model),
+                            prompt_source=intent_analysis.get('prompt_source', 'config_file'),
+                            confidence_threshold=confidence_threshold
+                        )
+                    }
                     
-                    # 1. 分析需要的工具
-                    tool_analysis = mcp_tool_analyzer.analyze_tools_needed(query_text)
+                    return jsonify({
+                        'success': True,
+                        'data': response_data
+                    })
                     
-                    # 2. 验证工具可用性
-                    tool_validation = mcp_tool_analyzer.validate_tools(tool_analysis.get('tools_needed', []))
+                except Exception as analysis_error:
+                    logger.error(f"文件夹分析失败: {analysis_error}")
+                    return jsonify({
+                        'success': False,
+                        'error': f"文件夹分析失败: {str(analysis_error)}"
+                    }), 500
+            
+            else:
+                # MCP文件操作：判定与执行统一由mcp_intent辅助模块处理
+                skip_search, mcp_tool_results = detect_and_execute_mcp(
+                    query_text, intent_analysis, confidence_threshold
+                )
+                if skip_search:
+                    _cancel_keyword_extraction(keyword_future)
                     
-                    if not tool_validation['all_valid']:
-                        # 有不可用的工具，返回错误信息
-                        error_msg = mcp_tool_analyzer.get_error_message(tool_validation['error_type'], tool_validation.get('invalid_tools', []))
-                        mcp_tool_results = [{'tool_name': 'error', 'arguments': {}, 'result': None, 'error': error_msg, 'timestamp': time.time()}]
-                        logger.warning(f"MCP工具验证失败: {error_msg}")
-                    else:
-                        # 3. 执行工具
-                        loop = asyncio.new_event_loop()
-                        asyncio.set_event_loop(loop)
-                        try:
-                            mcp_tool_results = loop.run_until_complete(
-                                mcp_tool_executor.execute_tools_from_analysis(query_text, tool_analysis)
-                            )
-                            logger.info(f"基于LLM分析的MCP工具执行完成，共 {len(mcp_tool_results)} 个步骤")
-                        except Exception as mcp_error:
-                            logger.error(f"MCP工具执行失败: {mcp_error}")
-                            mcp_tool_results = [{
-                                'tool_name': 'error',
-                                'arguments': {},
-                                'result': None,
-                                'error': f"MCP工具执行失败: {str(mcp_error)}",
-                                'timestamp': time.time()
-                            }]
-                        finally:
-                            loop.close()
-                        
+        except Exception as e:
+            logger.error(f"意图分析失败: {e}")
+            # 降级到向量搜索
+            intent_analysis = {
+                "intent_type": "vector_search",
+                "confidence": 0.5,
+                "action_type": "search_documents",
+                "reasoning": f"意图分析失败，降级到向量搜索: {str(e)}",
+                "used_llm": False,
+                "error": str(e),
+                "model_used": f"{Config.INTENT_ANALYSIS_LLM_PROVIDER}:{Config.INTENT_ANALYSIS_LLM_MODEL}",
+                "prompt_source": "config_file"
+            }
+    
+    # 只有在没有MCP操作时才执行搜索
+    if not skip_search:
+        # 进行关键词提取以优化搜索
+        if active_llm_model and _needs_keyword_extraction(query_text):
+            try:
+                # 使用专门的关键词提取功能
+                if keyword_future is not None:
+                    keyword_extraction = keyword_future.result()
+                else:
+                    keyword_extraction = LLMService.extract_search_keywords(query_text, active_llm_model)
+                optimized_query = keyword_extraction.get('optimized_query', query_text)
+                logger.info(f"混合搜索关键词提取完成 - 原查询: {query_text}, 优化查询: {optimized_query}")
             except Exception as e:
-                logger.error(f"意图分析失败: {e}")
-                # 降级到向量搜索
-                intent_analysis = {
-                    "intent_type": "vector_search",
-                    "confidence": 0.5,
-                    "action_type": "search_documents",
-                    "reasoning": f"意图分析失败，降级到向量搜索: {str(e)}",
-                    "used_llm": False,
-                    "error": str(e),
-                    "model_used": f"{Config.INTENT_ANALYSIS_LLM_PROVIDER}:{Config.INTENT_ANALYSIS_LLM_MODEL}",
-                    "prompt_source": "config_file"
-                }
+                logger.warning(f"混合搜索关键词提取失败，使用原查询: {e}")
+                optimized_query = query_text
+        
+        # 设置相似度阈值（针对银行等特定查询提高阈值）
+        min_score = SIMILARITY_THRESHOLDS.get(similarity_level, 0.3)
+        
+        # 对特定查询类型动态调整阈值（均为中文词，无需转小写）
+        if any(word in query_text for word in STRICT_THRESHOLD_TOKENS):
+            min_score = max(min_score, 0.4)  # 银行相关查询提高最低阈值
+            logger.info(f"检测到银行相关查询，提高阈值到: {min_score}")
+        
+        # 获取共享的向量服务（连接参数来自系统配置）
+        vector_service = get_configured_vector_service()
+        
+        # 1. 关键词搜索（使用优化后的查询）提交到线程池，与语义搜索的Milvus请求并行
+        keyword_search_future = _search_executor.submit(
+            vector_service.search_by_keywords,
+            query_text=optimized_query,
+            top_k=top_k,
+            document_id=document_id
+        )
         
-        # 只有在没有MCP操作时才执行搜索
-        if not skip_search:
-            # 进行关键词提取以优化搜索
-            original_query = query_text
-            optimized_query = query_text
-            keyword_extraction = None
-            
-            if use_llm and llm_model:
-                try:
-                    # 使用专门的关键词提取功能
-                    keyword_extraction = LLMService.extract_search_keywords(query_text, llm_model)
-                    optimized_query = keyword_extraction.get('optimized_query', query_text)
-                    logger.info(f"混合搜索关键词提取完成 - 原查询: {query_text}, 优化查询: {optimized_query}")
-                except Exception as e:
-                    logger.warning(f"混合搜索关键词提取失败，使用原查询: {e}")
-                    optimized_query = query_text
-            
-            # 设置相似度阈值（针对银行等特定查询提高阈值）
-            similarity_thresholds = {
-                'high': 0.6, 'medium': 0.3, 'low': 0.1, 'any': 0.0
-            }
-            min_score = similarity_thresholds.get(similarity_level, 0.3)
-            
-            # 对特定查询类型动态调整阈值
-            if any(word in query_text.lower() for word in ['银行', '金融机构', '贷款']):
-                min_score = max(min_score, 0.4)  # 银行相关查询提高最低阈值
-                logger.info(f"检测到银行相关查询，提高阈值到: {min_score}")
-            
-            # 初始化向量服务
-            milvus_host = SystemConfig.get_config('milvus_host', 'localhost')
-            milvus_port = SystemConfig.get_config('milvus_port', 19530)
-            embedding_model = SystemConfig.get_config('embedding_model')
-            
-            vector_service = VectorServiceAdapter(
-                milvus_host=milvus_host,
-                milvus_port=milvus_port,
-                embedding_model=embedding_model
-            )
-            
-            # 1. 执行语义搜索（使用优化后的查询）
-            semantic_results = vector_service.search_similar(
-                query_text=optimized_query,
+        # 2. 执行语义搜索（使用优化后的查询）；优化后的查询与原查询不同时，
+        #    两个查询向量在同一次Milvus请求中检索，再融合结果以兼顾原查询的召回；
+        #    过短或仅含停用词的查询只做关键词搜索
+        if not _should_semantic_search(optimized_query, min_score):
+            logger.info(f"查询过短或仅包含停用词，跳过语义检索: {optimized_query}")
+            semantic_results = []
+        elif Config.ENABLE_ORIGINAL_QUERY_FUSION and optimized_query.strip() != query_text.strip():
+            semantic_results = _fuse_semantic_results(vector_service.search_similar_batch(
+                query_texts=[optimized_query, query_text],
                 top_k=top_k,
                 document_id=document_id,
                 min_score=min_score
-            )
-            
-            # 2. 执行关键词搜索（使用优化后的查询）
-            keyword_results = vector_service.search_by_keywords(
+            ))
+        else:
+            semantic_results = vector_service.search_similar(
                 query_text=optimized_query,
                 top_k=top_k,
-                document_id=document_id
+                document_id=document_id,
+                min_score=min_score
             )
-            
-            # 3. 合并和去重结果
-            combined_results = merge_search_results(semantic_results, keyword_results, query_text)
-            
-            # 4. 丰富结果信息并按文件聚合
-            file_results = aggregate_results_by_file(combined_results)
-        else:
-            # 如果跳过搜索，初始化变量以避免后续处理中的错误
-            original_query = query_text
-            optimized_query = query_text
-            min_score = 0.0
-            file_results = []  # 初始化空的文件结果列表
-            semantic_results = []  # 初始化空的语义搜索结果
-            keyword_results = []   # 初始化空的关键词搜索结果
-        
-        # 5. LLM结果重排序（基于文件）
-        reranked = False
-        if use_llm and llm_model and file_results:
-            try:
-                file_results = LLMService.rerank_file_results(original_query, file_results, llm_model)
-                reranked = True
-                logger.info(f"混合搜索LLM文件结果重排序完成 - 处理了 {len(file_results)} 个文件")
-            except Exception as e:
-                logger.warning(f"混合搜索LLM结果重排序失败: {e}")
-        
-        # 6. LLM答案生成（使用智能提示词系统）
-        llm_answer = None
-        if use_llm and llm_model and file_results:
-            try:
-                # 准备上下文文本
-                context_texts = []
-                for file_result in file_results[:5]:  # 只使用前5个文件结果生成答案
-                    doc_name = file_result['document']['name']
-                    # 合并该文件的所有匹配片段
-                    chunks = [chunk['text'] for chunk in file_result['chunks'][:3]]  # 每个文件最多3个片段
-                    combined_text = '\n'.join(chunks)
-                    context_texts.append(f"文档《{doc_name}》：{combined_text}")
-                
-                context = '\n\n'.join(context_texts)
-                llm_answer = LLMService.generate_answer(
-                    original_query, 
-                    context, 
-                    llm_model=llm_model,
-                    scenario=None,  # 让系统自动分析
-                    style=None      # 让系统自动推荐
-                )
-                logger.info(f"混合搜索智能LLM答案生成完成 - 查询: {original_query}")
-            except Exception as e:
-                logger.warning(f"混合搜索LLM答案生成失败: {e}")
+        keyword_results = keyword_search_future.result()
+        
+        # 3. 合并去重并按文件聚合（一次遍历完成）
+        file_results = merge_and_aggregate(semantic_results, keyword_results)
+    else:
+        # 如果跳过搜索，初始化变量以避免后续处理中的错误
+        min_score = 0.0
+        file_results = []  # 初始化空的文件结果列表
+        semantic_results = []  # 初始化空的语义搜索结果
+        keyword_results = []   # 初始化空的关键词搜索结果
+    
+    # 5-6. LLM结果重排序（基于文件）与答案生成（使用智能提示词系统）
+    reranked = False
+    llm_answer = None
+    if active_llm_model and file_results:
+        file_results, reranked, llm_answer = rerank_and_generate_answer(
+            original_query, file_results, active_llm_model,
+            with_answer=not defer_answer, search_label='混合搜索'
+        )
 
-        # 7. MCP工具调用已在前面处理
-        
-        response_data = {
-            'query': query_text,
-            'similarity_level': similarity_level,
-            'total_files': len(file_results),
-            'file_results': file_results,
-            'search_type': 'hybrid'
+    # 7. MCP工具调用已在前面处理
+    
+    response_data = {
+        'query': query_text,
+        'similarity_level': similarity_level,
+        'total_files': len(file_results),
+        'file_results': file_results,
+        'search_type': 'hybrid'
+    }
+    
+    # 只在执行了搜索时才添加这些信息
+    if not skip_search:
+        response_data.update({
+            'min_score': min_score,
+            'semantic_count': len(semantic_results),
+            'keyword_count': len(keyword_results)
+        })
+    
+    # 添加意图分析结果
+    if intent_analysis:
+        response_data['intent_analysis'] = _intent_summary(intent_analysis)
+    
+    # 添加关键词提取结果
+    if not skip_search and keyword_extraction:
+        response_data['keyword_extraction'] = {
+            'original_query': keyword_extraction.get('original_query'),
+            'keywords': keyword_extraction.get('keywords'),
+            'optimized_query': keyword_extraction.get('optimized_query'),
+            'reasoning': keyword_extraction.get('reasoning'),
+            'used_llm': keyword_extraction.get('used_llm', False)
         }
-        
-        # 只在执行了搜索时才添加这些信息
-        if not skip_search:
-            response_data.update({
-                'min_score': min_score,
-                'semantic_count': len(semantic_results),
-                'keyword_count': len(keyword_results)
-            })
-        
-        # 添加意图分析结果
-        if intent_analysis:
-            response_data['intent_analysis'] = {
-                'intent_type': intent_analysis.get('intent_type'),
-                'confidence': intent_analysis.get('confidence'),
-                'action_type': intent_analysis.get('action_type'),
-                'reasoning': intent_analysis.get('reasoning'),
-                'used_llm': True
-            }
-        
-        # 添加关键词提取结果
-        if not skip_search and 'keyword_extraction' in locals() and keyword_extraction:
-            response_data['keyword_extraction'] = {
-                'original_query': keyword_extraction.get('original_query'),
-                'keywords': keyword_extraction.get('keywords'),
-                'optimized_query': keyword_extraction.get('optimized_query'),
-                'reasoning': keyword_extraction.get('reasoning'),
-                'used_llm': keyword_extraction.get('used_llm', False)
-            }
-        
-        # 添加LLM处理信息
-        if use_llm:
-            response_data['llm_info'] = {
-                'used': True,
-                'model': llm_model,
-                'original_query': original_query if not skip_search else query_text,
-                'optimized_query': optimized_query if not skip_search else query_text,
-                'query_optimized': (optimized_query != original_query) if not skip_search else False,
-                'reranked': reranked,
-                'answer': llm_answer
-            }
-        else:
-            response_data['llm_info'] = {
-                'used': False
-            }
-        
-        # 添加MCP工具结果
-        if mcp_tool_results:
-            response_data['mcp_results'] = [{
-                'tool_name': result.tool_name if hasattr(result, 'tool_name') else result.get('tool_name'),
-                'arguments': result.arguments if hasattr(result, 'arguments') else result.get('arguments', {}),
-                'result': result.result if hasattr(result, 'result') else result.get('result'),
-                'error': result.error if hasattr(result, 'error') else result.get('error'),
-                'timestamp': result.timestamp if hasattr(result, 'timestamp') else result.get('timestamp')
-            } for result in mcp_tool_results]
-        
-        logger.info(f"混合搜索完成 - semantic: {len(semantic_results)}, keyword: {len(keyword_results)}, files: {len(file_results)}")
-        
-        # 转换为标准化消息格式
-        message_content = []
-        
-        # 1. 添加意图分析结果（如果有）
-        if intent_analysis and intent_analysis.get('confidence', 0) > Config.INTENT_ANALYSIS_CONFIDENCE_THRESHOLD:
-            message_content.append({
-                "type": "text",
-                "data": f"🎯 意图识别: {intent_analysis.get('reasoning', '已识别用户意图')}"
-            })
-        
-        # 2. 添加LLM答案（如果有）
-        if 'llm_answer' in locals() and llm_answer:
-            message_content.append({
-                "type": "markdown",
-                "data": llm_answer
-            })
-        
-        # 3. 添加MCP工具执行结果（如果有）
-        if mcp_tool_results:
-            for mcp_result in mcp_tool_results:
-                # 处理dataclass对象或字典
-                error = getattr(mcp_result, 'error', None) if hasattr(mcp_result, 'error') else mcp_result.get('error') if isinstance(mcp_result, dict) else None
-                if error:
-                    message_content.append({
-                        "type": "text",
-                        "data": f"❌ 工具执行失败: {error}"
-                    })
-                else:
-                    tool_name = getattr(mcp_result, 'tool_name', None) if hasattr(mcp_result, 'tool_name') else mcp_result.get('tool_name', 'unknown') if isinstance(mcp_result, dict) else 'unknown'
-                    arguments = getattr(mcp_result, 'arguments', {}) if hasattr(mcp_result, 'arguments') else mcp_result.get('arguments', {}) if isinstance(mcp_result, dict) else {}
-                    result = getattr(mcp_result, 'result', None) if hasattr(mcp_result, 'result') else mcp_result.get('result') if isinstance(mcp_result, dict) else None
-                    
-                    message_content.append({
-                        "type": "tool_call",
-                        "data": {
-                            "tool": tool_name,
-                            "params": arguments,
-                            "result": result,
-                            "user_visible": True
-                        }
-                    })
-        
-        # 4. 添加搜索结果表格（如果有文件结果）
-        if file_results:
-            # 构建搜索结果表格
-            table_headers = ["文档", "相关度", "搜索类型", "内容预览"]
-            table_rows = []
-            
-            for file_result in file_results[:5]:  # 限制显示前5个结果
-                document = file_result.get('document', {})
-                
-                # 计算平均相关度
-                score = file_result.get('score', 0)
-                score_display = f"{score:.2f}" if score > 0 else "N/A"
-                
-                # 搜索类型
-                search_types = file_result.get('search_types', ['unknown'])
-                search_type_display = "+".join(search_types)
-                
-                # 内容预览（使用最佳chunk）
-                chunks = file_result.get('chunks', [])
-                content_preview = chunks[0].get('text', '')[:100] + "..." if chunks else "无预览"
-                
-                # 创建可点击的文件名（带文档ID用于前端点击处理）
-                file_name_with_link = {
-                    "text": document.get('name', '未知文档'),
-                    "document_id": document.get('id')
-                }
-                
-                table_rows.append([
-                    file_name_with_link,
-                    score_display,
-                    search_type_display,
-                    content_preview
-                ])
-            
-            if table_rows:
+    
+    # 添加LLM处理信息
+    if use_llm:
+        response_data['llm_info'] = {
+            'used': True,
+            'model': llm_model,
+            'original_query': original_query,
+            'optimized_query': optimized_query,
+            'query_optimized': optimized_query != original_query,
+            'reranked': reranked,
+            'answer': llm_answer
+        }
+    else:
+        response_data['llm_info'] = {
+            'used': False
+        }
+    
+    # 添加MCP工具结果
+    if mcp_tool_results:
+        response_data['mcp_results'] = mcp_tool_results
+    
+    logger.info(f"混合搜索完成 - semantic: {len(semantic_results)}, keyword: {len(keyword_results)}, files: {len(file_results)}")
+    
+    # 转换为标准化消息格式
+    message_content = []
+    
+    # 1. 添加意图分析结果（如果有）
+    if intent_analysis and intent_analysis.get('confidence', 0) > Config.INTENT_ANALYSIS_CONFIDENCE_THRESHOLD:
+        message_content.append({
+            "type": "text",
+            "data": f"🎯 意图识别: {intent_analysis.get('reasoning', '已识别用户意图')}"
+        })
+    
+    # 2. 添加LLM答案（如果有）
+    if llm_answer:
+        message_content.append({
+            "type": "markdown",
+            "data": llm_answer
+        })
+    
+    # 3. 添加MCP工具执行结果（如果有）
+    if mcp_tool_results:
+        for mcp_result in mcp_tool_results:
+            error = mcp_result.get('error')
+            if error:
+                message_content.append({
+                    "type": "text",
+                    "data": f"❌ 工具执行失败: {error}"
+                })
+            else:
                 message_content.append({
-                    "type": "table",
+                    "type": "tool_call",
                     "data": {
-                        "headers": table_headers,
-                        "rows": table_rows
+                        "tool": mcp_result.get('tool_name', 'unknown'),
+                        "params": mcp_result.get('arguments', {}),
+                        "result": mcp_result.get('result'),
+                        "user_visible": True
                     }
                 })
-        
-        # 6. 如果没有找到结果，添加建议
-        if not file_results and not mcp_tool_results:
+    
+    # 4. 添加搜索结果表格（如果有文件结果）
+    if file_results:
+        # 构建搜索结果表格
+        table_headers = ["文档", "相关度", "搜索类型", "内容预览"]
+        table_rows = []
+        
+        for file_result in file_results[:5]:  # 限制显示前5个结果
+            document = file_result.get('document', {})
+            
+            # 计算平均相关度
+            score = file_result.get('score', 0)
+            score_display = f"{score:.2f}" if score > 0 else "N/A"
+            
+            # 搜索类型
+            search_types = file_result.get('search_types', ['unknown'])
+            search_type_display = "+".join(search_types)
+            
+            # 内容预览（使用最佳chunk）
+            chunks = file_result.get('chunks', [])
+            content_preview = chunks[0].get('text', '')[:100] + "..." if chunks else "无预览"
+            
+            # 创建可点击的文件名（带文档ID用于前端点击处理）
+            file_name_with_link = {
+                "text": document.get('name', '未知文档'),
+                "document_id": document.get('id')
+            }
+            
+            table_rows.append([
+                file_name_with_link,
+                score_display,
+                search_type_display,
+                content_preview
+            ])
+        
+        if table_rows:
             message_content.append({
-                "type": "text",
-                "data": "😔 未找到相关内容，建议："
+                "type": "table",
+                "data": {
+                    "headers": table_headers,
+                    "rows": table_rows
+                }
             })
-            message_content.append({
-                "type": "markdown",
-                "data": f"""
+    
+    # 6. 如果没有找到结果，添加建议
+    if not file_results and not mcp_tool_results:
+        message_content.append({
+            "type": "text",
+            "data": "😔 未找到相关内容，建议："
+        })
+        message_content.append({
+            "type": "markdown",
+            "data": f"""
 ## 💡 搜索建议
 
 - **调整关键词**: 尝试使用更具体的词汇
@@ -1543,130 +1663,316 @@ def hybrid_search():
 **原始查询**: `{original_query}`  
 **优化查询**: `{optimized_query}`
 """
-            })
-        
-        # 构建标准化响应格式
-        standardized_response = {
-            "message_id": f"msg-{int(time.time())}-{hash(query_text) % 1000:03d}",
-            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
-            "role": "assistant",
-            "content": message_content,
-            # 保持原有数据结构以确保向后兼容
-            "legacy_data": response_data
-        }
-        
-        return jsonify({
-            'success': True,
-            'data': standardized_response
         })
-        
-    except Exception as e:
-        logger.error(f"混合搜索失败: {str(e)}")
+    
+    # 构建标准化响应格式
+    standardized_response = _assistant_message(message_content, legacy_data=response_data)
+    
+    # 只缓存普通检索结果：跳过检索（文件夹分析/MCP操作）、无结果或LLM答案生成失败时不缓存
+    if (not skip_search and not mcp_tool_results and file_results and
+            _llm_stage_succeeded(active_llm_model, file_results, llm_answer, not defer_answer)):
+        _cache_search_response(cache_key, standardized_response)
+    
+    return jsonify({
+        'success': True,
+        'data': standardized_response
+    })
+
+@search_bp.route('/answer/stream', methods=['POST'])
+def stream_answer():
+    """流式生成LLM答案（Server-Sent Events）
+    
+    请求体包含query、llm_model以及检索接口返回的file_results；
+    事件依次为若干 {"type": "token", "delta": ...}，最后为 {"type": "done"} 或 {"type": "error"}。
+    """
+    data = request.get_json() or {}
+    query_text = data.get('query', '').strip()
+    llm_model = data.get('llm_model')
+    
+    if not query_text or not llm_model:
         return jsonify({
             'success': False,
-            'error': str(e)
-        }), 500
+            'error': '查询内容和LLM模型不能为空'
+        }), 400
+    
+    try:
+        context = build_answer_context(data.get('file_results') or [])
+    except (KeyError, TypeError) as e:
+        return jsonify({
+            'success': False,
+            'error': f'file_results格式不正确: {str(e)}'
+        }), 400
+    
+    def generate():
+        try:
+            for delta in LLMService.generate_answer_stream(query_text, context, llm_model=llm_model):
+                yield _sse_event({'type': 'token', 'delta': delta})
+            yield _sse_event({'type': 'done'})
+            logger.info(f"流式答案生成完成 - 查询: {query_text}")
+        except Exception as e:
+            logger.error(f"流式答案生成失败: {str(e)}")
+            yield _sse_event({'type': 'error', 'error': str(e)})
+    
+    return Response(
+        stream_with_context(generate()),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+# 流式语义检索每批补充文档信息的结果数
+STREAM_ENRICH_BATCH_SIZE = 10
+
+@search_bp.route('/stream', methods=['POST'])
+def stream_search():
+    """流式语义检索（NDJSON）
+    
+    检索完成后按批补充文档信息并逐行输出，客户端无需等待全部结果编码完成即可开始渲染；
+    每行依次为 {"type": "result", "result": ...}，最后为 {"type": "done", "total": n} 或 {"type": "error"}。
+    不经过意图分析、关键词提取和LLM处理。
+    """
+    data = request.get_json() or {}
+    query_text = data.get('query', '').strip()
+    top_k = data.get('top_k', 10)
+    document_id = data.get('document_id')
+    min_score = SIMILARITY_THRESHOLDS.get(data.get('similarity_level', 'medium'), 0.3)
+    
+    if not query_text:
+        return jsonify({
+            'success': False,
+            'error': '查询内容不能为空'
+        }), 400
+    
+    def generate():
+        try:
+            raw_results = []
+            if _should_semantic_search(query_text, min_score):
+                raw_results = get_vector_service().search_similar(
+                    query_text=query_text,
+                    top_k=top_k,
+                    document_id=document_id,
+                    min_score=min_score
+                )
+            
+            total = 0
+            for start in range(0, len(raw_results), STREAM_ENRICH_BATCH_SIZE):
+                batch = raw_results[start:start + STREAM_ENRICH_BATCH_SIZE]
+                doc_ids = {int(result['document_id']) for result in batch
+                           if str(result.get('document_id') or '').isdigit()}
+                for result in _enrich_semantic_results(batch, _load_document_infos(doc_ids)):
+                    total += 1
+                    yield _ndjson_line({'type': 'result', 'result': result})
+            
+            yield _ndjson_line({'type': 'done', 'total': total})
+            logger.info(f"流式语义检索完成 - 查询: {query_text}, 结果数: {total}")
+        except Exception as e:
+            logger.error(f"流式语义检索失败: {str(e)}")
+            yield _ndjson_line({'type': 'error', 'error': str(e)})
+    
+    return Response(
+        stream_with_context(generate()),
+        mimetype='application/x-ndjson',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+def _ndjson_line(payload):
+    """编码一行NDJSON（使用应用的JSON实现，安装orjson时由其编码；不缩进，保证每条结果占一行）"""
+    return current_app.json.dumps(payload, sort_keys=False) + '\n'
+
+def _sse_event(payload):
+    """编码一条SSE事件（使用应用的JSON实现，安装orjson时由其编码）"""
+    return f"data: {current_app.json.dumps(payload, sort_keys=False)}\n\n"
+
+def build_answer_context(file_results, max_chars=None):
+    """构建LLM答案生成的上下文文本
+    
+    格式为 文档《名称》：片段1\n片段2，文件之间以空行分隔；
+    单个片段超过 ANSWER_CONTEXT_CHUNK_MAX_CHARS 时截断，
+    总长度不超过 max_chars（默认 LLM_MAX_CONTEXT_LENGTH），控制提示词长度。
+    """
+    remaining = Config.LLM_MAX_CONTEXT_LENGTH if max_chars is None else max_chars
+    buf = io.StringIO()
+    
+    def write(text):
+        nonlocal remaining
+        remaining -= buf.write(text[:remaining])
+        return remaining > 0
+    
+    for i, file_result in enumerate(file_results[:ANSWER_CONTEXT_MAX_FILES]):
+        if i and not write('\n\n'):
+            break
+        if not write(f"文档《{file_result['document']['name']}》："):
+            break
+        for j, chunk in enumerate(file_result['chunks'][:ANSWER_CONTEXT_MAX_CHUNKS]):
+            if (j and not write('\n')) or not write(chunk['text'][:ANSWER_CONTEXT_CHUNK_MAX_CHARS]):
+                break
+        if remaining <= 0:
+            break
+    return buf.getvalue()
+
+def rerank_and_generate_answer(query_text, file_results, llm_model, with_answer=True, search_label='搜索'):
+    """LLM文件结果重排序并生成答案，返回 (file_results, reranked, llm_answer)
+    
+    文件数不超过ANSWER_CONTEXT_MAX_FILES时，重排序只改变顺序、不改变进入答案上下文的文件，
+    此时答案生成与重排序并行执行；否则需等待重排序确定前N个文件后再生成答案。
+    """
+    def generate(results):
+        try:
+            answer = LLMService.generate_answer(
+                query_text,
+                build_answer_context(results),
+                llm_model=llm_model,
+                scenario=None,  # 让系统自动分析
+                style=None      # 让系统自动推荐
+            )
+            logger.info(f"{search_label}智能LLM答案生成完成 - 查询: {query_text}")
+            return answer
+        except Exception as e:
+            logger.warning(f"{search_label}LLM答案生成失败: {e}")
+            return None
+    
+    answer_future = None
+    if with_answer and len(file_results) <= ANSWER_CONTEXT_MAX_FILES:
+        answer_future = _llm_executor.submit(generate, file_results)
+    
+    # 只有一个文件时无需重排序
+    reranked = False
+    if len(file_results) > 1:
+        try:
+            file_results = LLMService.rerank_file_results(query_text, file_results, llm_model)
+            reranked = True
+            logger.info(f"{search_label}LLM文件结果重排序完成 - 处理了 {len(file_results)} 个文件")
+        except Exception as e:
+            logger.warning(f"{search_label}LLM结果重排序失败: {e}")
+    
+    llm_answer = None
+    if answer_future is not None:
+        llm_answer = answer_future.result()
+    elif with_answer:
+        llm_answer = generate(file_results)
+    
+    return file_results, reranked, llm_answer
+
+def _fuse_semantic_results(result_lists):
+    """融合多个查询的语义搜索结果：同一chunk只保留一条（取最高得分），保持首次出现的顺序"""
+    fused = {}
+    for results in result_lists:
+        for result in results:
+            key = (result['document_id'], result['chunk_id'])
+            existing = fused.get(key)
+            if existing is None:
+                fused[key] = result
+            elif result['score'] > existing['score']:
+                existing['score'] = result['score']
+    return list(fused.values())
 
-def merge_search_results(semantic_results, keyword_results, query_text):
-    """合并语义搜索和关键词搜索结果"""
+def merge_and_aggregate(semantic_results, keyword_results):
+    """合并语义搜索和关键词搜索结果并直接按文件聚合
+    
+    去重与按文档分组在同一次遍历中完成，不再生成排序后的中间合并列表
+    （文件内chunk和文件之间的排序由聚合步骤负责）。
+    """
     try:
-        # 使用文档ID+chunk_id作为唯一标识符
+        # 使用(文档ID, chunk_id)元组作为唯一标识符
+        # search_similar/search_by_keywords 返回的结果都带有chunk_id字段
         seen_results = {}
-        merged_results = []
+        file_groups = {}
         
         # 处理语义搜索结果（优先级更高）
         for result in semantic_results:
-            key = f"{result['document_id']}_{result.get('chunk_id', '')}"
             result['search_type'] = 'semantic'
-            seen_results[key] = result
-            merged_results.append(result)
+            seen_results[(result['document_id'], result['chunk_id'])] = result
+            file_groups.setdefault(str(result['document_id']), []).append(result)
         
         # 处理关键词搜索结果
         for result in keyword_results:
-            key = f"{result['document_id']}_{result.get('chunk_id', '')}"
-            if key not in seen_results:
+            existing = seen_results.get((result['document_id'], result['chunk_id']))
+            if existing is None:
                 result['search_type'] = 'keyword'
-                merged_results.append(result)
+                file_groups.setdefault(str(result['document_id']), []).append(result)
             else:
                 # 如果已存在，更新搜索类型为混合
-                seen_results[key]['search_type'] = 'hybrid'
+                existing['search_type'] = 'hybrid'
         
-        # 按相关度排序
-        merged_results.sort(key=lambda x: x.get('score', 0), reverse=True)
-        
-        return merged_results
+        return _aggregate_file_groups(file_groups, sum(map(len, file_groups.values())))
         
     except Exception as e:
         logger.error(f"合并搜索结果失败: {str(e)}")
-        return semantic_results  # fallback到语义搜索结果
+        return []
 
 def aggregate_results_by_file(chunk_results):
     """将chunk级别的搜索结果聚合为文件级别"""
     try:
         file_groups = {}
         
-        # 按文档ID分组
+        # 按文档ID分组；单一来源的结果在此统一补齐search_type
         for result in chunk_results:
-            doc_id = str(result['document_id'])
-            if doc_id not in file_groups:
-                file_groups[doc_id] = []
-            file_groups[doc_id].append(result)
-        
-        file_results = []
-        
-        # 为每个文件创建聚合结果
-        for doc_id, chunks in file_groups.items():
-            document = DocumentNode.query.get(doc_id)
-            if not document or document.is_deleted:
-                continue
-            
-            # 计算文件级别的综合得分
-            scores = [chunk.get('score', 0) for chunk in chunks]
-            max_score = max(scores) if scores else 0
-            avg_score = sum(scores) / len(scores) if scores else 0
-            combined_score = max_score * 0.7 + avg_score * 0.3  # 权重组合
-            
-            # 按得分对chunks排序
-            chunks.sort(key=lambda x: x.get('score', 0), reverse=True)
-            
-            # 创建文件级别的结果
-            file_result = {
-                'document': {
-                    'id': document.id,
-                    'name': document.name,
-                    'file_type': document.file_type,
-                    'file_path': document.file_path,
-                    'description': document.description,
-                    'file_size': document.file_size,
-                    'parent_id': document.parent_id
-                },
-                'score': combined_score,
-                'max_chunk_score': max_score,
-                'chunk_count': len(chunks),
-                'chunks': [
-                    {
-                        'chunk_id': chunk.get('chunk_id'),
-                        'text': chunk.get('text', ''),
-                        'score': chunk.get('score', 0),
-                        'search_type': chunk.get('search_type', 'unknown')
-                    }
-                    for chunk in chunks
-                ],
-                'search_types': list(set(chunk.get('search_type', 'unknown') for chunk in chunks))
-            }
-            
-            file_results.append(file_result)
+            result.setdefault('search_type', 'unknown')
+            file_groups.setdefault(str(result['document_id']), []).append(result)
         
-        # 按综合得分排序
-        file_results.sort(key=lambda x: x['score'], reverse=True)
-        
-        logger.info(f"文件聚合完成 - 从 {len(chunk_results)} 个chunk聚合为 {len(file_results)} 个文件")
-        return file_results
+        return _aggregate_file_groups(file_groups, len(chunk_results))
         
     except Exception as e:
         logger.error(f"文件聚合失败: {str(e)}")
         return []
 
+def _aggregate_file_groups(file_groups, chunk_count):
+    """根据 {文档ID: [chunk结果]} 生成按综合得分排序的文件级结果"""
+    # 一次IN查询批量加载涉及的文档，只取聚合结果需要的列（与DocumentNode.to_search_dict一致）
+    doc_ids = [int(doc_id) for doc_id in file_groups if doc_id.isdigit()]
+    documents = {
+        str(document.id): document
+        for document in DocumentNode.query.options(
+            load_only(
+                DocumentNode.id, DocumentNode.name, DocumentNode.file_type, DocumentNode.file_path,
+                DocumentNode.description, DocumentNode.file_size, DocumentNode.parent_id
+            )
+        ).filter(
+            DocumentNode.id.in_(doc_ids),
+            DocumentNode.is_deleted == False
+        ).all()
+    } if doc_ids else {}
+    
+    # 只保留文档仍然存在的分组
+    groups = [(documents[doc_id], chunks) for doc_id, chunks in file_groups.items() if doc_id in documents]
+    if not groups:
+        logger.info(f"文件聚合完成 - 从 {chunk_count} 个chunk聚合为 0 个文件")
+        return []
+    
+    # 所有分组的得分拼接为一个数组，按分组边界一次性求每个文件的最大值和平均值
+    counts = np.fromiter((len(chunks) for _, chunks in groups), dtype=np.intp, count=len(groups))
+    starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+    scores = np.fromiter(
+        (_chunk_score(chunk) for _, chunks in groups for chunk in chunks),
+        dtype=np.float64, count=int(counts.sum())
+    )
+    max_scores = np.maximum.reduceat(scores, starts)
+    avg_scores = np.add.reduceat(scores, starts) / counts
+    combined_scores = max_scores * 0.7 + avg_scores * 0.3  # 权重组合
+    
+    # 组内按得分降序排列chunk（lexsort稳定，同分保持原顺序）
+    group_index = np.repeat(np.arange(len(groups)), counts)
+    chunk_order = np.lexsort((-scores, group_index))
+    
+    # 按综合得分排序文件（稳定排序）
+    file_results = []
+    for g in np.argsort(-combined_scores, kind='stable'):
+        document, chunks = groups[g]
+        start = starts[g]
+        chunks = [chunks[i - start] for i in chunk_order[start:start + counts[g]]]
+        
+        # 创建文件级别的结果
+        file_results.append({
+            'document': document.to_search_dict(),
+            'score': float(combined_scores[g]),
+            'max_chunk_score': float(max_scores[g]),
+            'chunk_count': len(chunks),
+            'chunks': [dict(zip(FILE_CHUNK_FIELDS, _chunk_fields(chunk))) for chunk in chunks],
+            'search_types': _collect_search_types(chunks)
+        })
+    
+    logger.info(f"文件聚合完成 - 从 {chunk_count} 个chunk聚合为 {len(file_results)} 个文件")
+    return file_results
+
 def detect_analysis_intent(query_text):
     """检测查询中是否包含文档分析意图"""
     import re
@@ -1945,57 +2251,41 @@ def handle_document_analysis(analysis_intent, llm_model):
         }), 500
 
 
+def _extract_url_argument(query_text: str) -> dict:
+    """提取URL参数，未找到完整URL时使用占位地址（需用户补充）"""
+    url_match = _URL_RE.search(query_text)
+    return {'url': url_match.group() if url_match else 'https://www.example.com'}
+
+def _extract_click_argument(query_text: str) -> dict:
+    """点击需要选择器，从查询中提取"""
+    if '按钮' in query_text:
+        return {'selector': 'button'}
+    if '链接' in query_text:
+        return {'selector': 'a'}
+    return {'selector': '*'}
+
+# 工具名 -> 参数提取函数
+_TOOL_ARGUMENT_EXTRACTORS = {
+    'navigate': _extract_url_argument,
+    # 对于网络搜索，直接使用查询文本
+    'web_search': lambda query_text: {'query': query_text, 'num_results': 5},
+    # 截图工具通常不需要特定参数
+    'screenshot': lambda query_text: {'full_page': True},
+    'click': _extract_click_argument,
+    # 表单填写需要选择器和值
+    'fill_form': lambda query_text: {'selector': 'input', 'value': '示例值'},
+    'get_page_content': _extract_url_argument,
+}
+
 def _extract_tool_arguments(tool_info: dict, query_text: str) -> dict:
     """从查询文本中提取工具参数"""
     tool_name = tool_info.get('name', '')
     parameters = tool_info.get('parameters', {})
-    arguments = {}
     
     try:
-        # 根据工具类型和参数定义提取参数
-        if tool_name == 'navigate':
-            # 提取URL
-            import re
-            url_pattern = r'https?://[^\s]+'
-            url_match = re.search(url_pattern, query_text)
-            if url_match:
-                arguments['url'] = url_match.group()
-            else:
-                # 如果没有找到完整URL，可能需要用户补充
-                arguments['url'] = 'https://www.example.com'
-        
-        elif tool_name == 'web_search':
-            # 对于网络搜索，直接使用查询文本
-            arguments['query'] = query_text
-            arguments['num_results'] = 5
-        
-        elif tool_name == 'screenshot':
-            # 截图工具通常不需要特定参数
-            arguments['full_page'] = True
-        
-        elif tool_name == 'click':
-            # 点击需要选择器，从查询中提取
-            if '按钮' in query_text:
-                arguments['selector'] = 'button'
-            elif '链接' in query_text:
-                arguments['selector'] = 'a'
-            else:
-                arguments['selector'] = '*'
-        
-        elif tool_name == 'fill_form':
-            # 表单填写需要选择器和值
-            arguments['selector'] = 'input'
-            arguments['value'] = '示例值'
-        
-        elif tool_name == 'get_page_content':
-            # 获取页面内容
-            import re
-            url_pattern = r'https?://[^\s]+'
-            url_match = re.search(url_pattern, query_text)
-            if url_match:
-                arguments['url'] = url_match.group()
-            else:
-                arguments['url'] = 'https://www.example.com'
+        # 根据工具类型提取参数
+        extractor = _TOOL_ARGUMENT_EXTRACTORS.get(tool_name)
+        arguments = extractor(query_text) if extractor else {}
         
         # 如果工具有必需参数但未提取到，使用默认值
         for param_name, param_info in parameters.items():
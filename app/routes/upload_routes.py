@@ -5,7 +5,7 @@ from flask import Blueprint, request, jsonify, current_app
 from app import db
 from app.models import DocumentNode, DocumentContent, VectorRecord, SystemConfig, Tag, DocumentTag
 import logging
-from app.services.vectorization import VectorServiceAdapter
+from app.services.vectorization import get_vector_service, get_vector_service_config
 from app.services.vectorization.vectorization_factory import VectorizationFactory
 
 logger = logging.getLogger(__name__)
@@ -301,11 +301,9 @@ def vectorize_document():
             }), 400
         
         # 初始化向量服务
-        milvus_host = SystemConfig.get_config('milvus_host', 'localhost')
-        milvus_port = SystemConfig.get_config('milvus_port', 19530)
-        embedding_model = SystemConfig.get_config('embedding_model')
+        milvus_host, milvus_port, embedding_model = get_vector_service_config()
         
-        vector_service = VectorServiceAdapter(
+        vector_service = get_vector_service(
             milvus_host=milvus_host,
             milvus_port=milvus_port,
             embedding_model=embedding_model
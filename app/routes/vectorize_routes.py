@@ -969,48 +969,38 @@ def execute_batch_vectorization():
 def get_batch_progress():
     """获取批量向量化进度"""
     try:
-        # 获取正在处理的文档
-        processing_docs = DocumentNode.query.filter_by(
-            type='file',
-            is_deleted=False,
-            vector_status='processing'
-        ).all()
+        # 正在处理和失败的文档在一次查询中取回（只查询需要的列），再按状态分组
+        processing_docs = []
+        failed_docs = []
+        for doc_id, name, file_path, vector_status in db.session.query(
+            DocumentNode.id, DocumentNode.name, DocumentNode.file_path, DocumentNode.vector_status
+        ).filter(
+            DocumentNode.type == 'file',
+            DocumentNode.is_deleted == False,
+            DocumentNode.vector_status.in_(('processing', 'failed'))
+        ).all():
+            doc_info = {
+                'id': doc_id,
+                'name': name,
+                'file_type': vectorization_factory.get_file_type(file_path) if file_path else 'unknown'
+            }
+            (processing_docs if vector_status == 'processing' else failed_docs).append(doc_info)
         
-        # 获取已完成和失败的文档
+        # 获取已完成的文档数量
         completed_docs = DocumentNode.query.filter_by(
             type='file',
             is_deleted=False,
             is_vectorized=True
         ).count()
         
-        failed_docs = DocumentNode.query.filter_by(
-            type='file',
-            is_deleted=False,
-            vector_status='failed'
-        ).all()
-        
         return jsonify({
             'success': True,
             'data': {
                 'processing_count': len(processing_docs),
                 'completed_count': completed_docs,
                 'failed_count': len(failed_docs),
-                'processing_docs': [
-                    {
-                        'id': doc.id,
-                        'name': doc.name,
-                        'file_type': vectorization_factory.get_file_type(doc.file_path) if doc.file_path else 'unknown'
-                    }
-                    for doc in processing_docs
-                ],
-                'failed_docs': [
-                    {
-                        'id': doc.id,
-                        'name': doc.name,
-                        'file_type': vectorization_factory.get_file_type(doc.file_path) if doc.file_path else 'unknown'
-                    }
-                    for doc in failed_docs
-                ]
+                'processing_docs': processing_docs,
+                'failed_docs': failed_docs
             }
         })
         
@@ -85,9 +85,9 @@ class DocumentGenerationService:
                 
                 try:
                     # 使用源路径作为搜索关键词进行向量检索
-                    from app.services.vectorization.vector_service_adapter import VectorServiceAdapter
+                    from app.services.vectorization.vector_service_adapter import get_vector_service
                     
-                    vector_adapter = VectorServiceAdapter()
+                    vector_adapter = get_vector_service()
                     search_results = vector_adapter.search(
                         query_text=source_path,  # 直接使用源路径作为搜索关键词
                         top_k=10,
@@ -8,10 +8,10 @@
 import re
 import json
 import logging
-import hashlib
 from typing import Dict, Any, Optional, List, Tuple
-from datetime import datetime, timedelta
+from datetime import datetime
 from .intent_config_manager import intent_config
+from .llm.cache import LLMResultCache, normalize_query
 
 logger = logging.getLogger(__name__)
 
@@ -30,7 +30,12 @@ class IntentRecognitionService:
     
     def __init__(self):
         self.config_manager = intent_config
-        self.cache = {}  # 简单内存缓存
+        # 内存缓存（LRU + TTL），容量与过期时间来自意图识别配置
+        cache_config = self.config_manager.get_cache_config()
+        self.cache = LLMResultCache(
+            max_size=cache_config.get('max_entries', 1000),
+            ttl=cache_config.get('ttl', 3600)
+        )
 
     
     def analyze_intent(self, query: str, scenario: str = None) -> Dict[str, Any]:
@@ -51,11 +56,12 @@ class IntentRecognitionService:
         
         # 检查缓存
         cache_key = self._generate_cache_key(query, scenario)
-        if self.config_manager.is_cache_enabled() and cache_key in self.cache:
-            cached_result = self.cache[cache_key]
-            if self._is_cache_valid(cached_result):
+        if self.config_manager.is_cache_enabled():
+            cached_result = self.cache.get(cache_key)
+            if cached_result is not None:
                 logger.info(f"使用缓存结果: {query[:50]}")
-                return cached_result['result']
+                # 返回副本，调用方补充字段不影响缓存内容
+                return dict(cached_result, cache_hit=True)
         
         # 尝试LLM分析
         llm_result = self._analyze_with_llm(query, scenario)
@@ -70,7 +76,8 @@ class IntentRecognitionService:
         
         # 缓存结果
         if self.config_manager.is_cache_enabled():
-            self._cache_result(cache_key, final_result)
+            self.cache.set(cache_key, dict(final_result))
+        final_result['cache_hit'] = False
         
         # 记录分析指标
         self._log_analysis_metrics(query, final_result)
@@ -390,37 +397,11 @@ class IntentRecognitionService:
     
     # 缓存相关方法
     
-    def _generate_cache_key(self, query: str, scenario: str = None) -> str:
-        """生成缓存键"""
-        key_data = f"{query}_{scenario or 'default'}"
-        return hashlib.md5(key_data.encode('utf-8')).hexdigest()
-    
-    def _is_cache_valid(self, cached_item: Dict) -> bool:
-        """检查缓存是否有效"""
-        cache_config = self.config_manager.get_cache_config()
-        ttl = cache_config.get('ttl', 3600)
-        timestamp = cached_item.get('timestamp')
-        
-        if not timestamp:
-            return False
-        
-        cache_time = datetime.fromisoformat(timestamp)
-        return datetime.now() - cache_time < timedelta(seconds=ttl)
-    
-    def _cache_result(self, cache_key: str, result: Dict[str, Any]):
-        """缓存结果"""
-        cache_config = self.config_manager.get_cache_config()
-        max_entries = cache_config.get('max_entries', 1000)
-        
-        if len(self.cache) >= max_entries:
-            # 简单的LRU：删除最旧的条目
-            oldest_key = min(self.cache.keys(), key=lambda k: self.cache[k]['timestamp'])
-            del self.cache[oldest_key]
-        
-        self.cache[cache_key] = {
-            'result': result,
-            'timestamp': datetime.now().isoformat()
-        }
+    def _generate_cache_key(self, query: str, scenario: str = None) -> tuple:
+        """生成缓存键：规范化查询文本，并包含当前提供商和模型，切换模型后不会命中旧结果"""
+        service_config = self.config_manager.config.get('service', {})
+        return (normalize_query(query), scenario or 'default',
+                service_config.get('current_provider'), service_config.get('current_model'))
     
     def _log_analysis_metrics(self, query: str, result: Dict[str, Any]):
         """记录分析指标"""
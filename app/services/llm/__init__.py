@@ -6,10 +6,11 @@ LLM服务模块
 
 from .service import LLMService
 from .factory import LLMClientFactory
-from .base_client import BaseLLMClient
+from .base_client import BaseLLMClient, FallbackAnswer
 
 __all__ = [
     'LLMService',
     'LLMClientFactory', 
-    'BaseLLMClient'
+    'BaseLLMClient',
+    'FallbackAnswer'
 ] 
\ No newline at end of file
@@ -7,9 +7,11 @@ LLM客户端基类
 import os
 import json
 import logging
+import threading
 import requests
+from requests.adapters import HTTPAdapter
 from abc import ABC, abstractmethod
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Iterator
 from config import Config
 
 # 导入提示词服务
@@ -21,6 +23,33 @@ except ImportError:
 
 logger = logging.getLogger(__name__)
 
+# 共享的HTTP会话：复用TCP/TLS连接（keep-alive），避免每次LLM调用重新握手
+HTTP_POOL_MAXSIZE = 20
+_http_session = None
+_http_session_lock = threading.Lock()
+
+def get_http_session() -> requests.Session:
+    """获取所有LLM客户端共享的HTTP会话"""
+    global _http_session
+    
+    if _http_session is None:
+        with _http_session_lock:
+            if _http_session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=10, pool_maxsize=HTTP_POOL_MAXSIZE)
+                session.mount('http://', adapter)
+                session.mount('https://', adapter)
+                _http_session = session
+    
+    return _http_session
+
+
+class FallbackAnswer(str):
+    """LLM调用失败时返回的降级提示文本
+
+    行为与普通字符串一致（可直接展示给用户），调用方据此区分真实答案，避免将降级文本写入缓存
+    """
+
 
 class BaseLLMClient(ABC):
     """LLM客户端基类"""
@@ -32,6 +61,7 @@ class BaseLLMClient(ABC):
         self.timeout = Config.LLM_TIMEOUT
         self.max_context_length = Config.LLM_MAX_CONTEXT_LENGTH
         self.prompt_service = prompt_service
+        self.session = get_http_session()
     
     @abstractmethod
     def optimize_query(self, query: str, scenario: str = None, template: str = None) -> str:
@@ -48,6 +78,12 @@ class BaseLLMClient(ABC):
         """答案生成：基于检索结果生成自然语言答案"""
         pass
     
+    def generate_answer_stream(self, query: str, context: str, scenario: str = None, style: str = None) -> Iterator[str]:
+        """流式答案生成：默认一次性返回完整答案，支持流式接口的客户端可覆盖"""
+        answer = self.generate_answer(query, context, scenario=scenario, style=style)
+        if answer:
+            yield answer
+    
     def _make_request(self, data: Dict, headers: Dict = None) -> Dict:
         """统一的HTTP请求方法"""
         try:
@@ -58,7 +94,7 @@ class BaseLLMClient(ABC):
             if headers:
                 default_headers.update(headers)
             
-            response = requests.post(
+            response = self.session.post(
                 f"{self.base_url}/chat/completions",
                 json=data,
                 headers=default_headers,
@@ -71,6 +107,42 @@ class BaseLLMClient(ABC):
             logger.error(f"LLM请求失败: {e}")
             raise Exception(f"LLM服务调用失败: {str(e)}")
     
+    def _stream_request(self, data: Dict, headers: Dict = None) -> Iterator[str]:
+        """OpenAI兼容接口的流式请求（SSE），逐段返回增量文本"""
+        try:
+            default_headers = {
+                'Content-Type': 'application/json',
+                'Authorization': f'Bearer {self.api_key}'
+            }
+            if headers:
+                default_headers.update(headers)
+            
+            with self.session.post(
+                f"{self.base_url}/chat/completions",
+                json={**data, 'stream': True},
+                headers=default_headers,
+                timeout=self.timeout,
+                stream=True
+            ) as response:
+                response.raise_for_status()
+                for line in response.iter_lines():
+                    # SSE数据行格式为 "data: {...}"，按UTF-8解码避免中文乱码
+                    if not line.startswith(b'data:'):
+                        continue
+                    payload = line[5:].strip()
+                    if payload == b'[DONE]':
+                        break
+                    
+                    choices = json.loads(payload).get('choices') or []
+                    if choices:
+                        delta = (choices[0].get('delta') or {}).get('content')
+                        if delta:
+                            yield delta
+            
+        except requests.exceptions.RequestException as e:
+            logger.error(f"LLM流式请求失败: {e}")
+            raise Exception(f"LLM服务调用失败: {str(e)}")
+    
     def _call_llm_with_prompt(self, system_prompt: str, user_prompt: str, parameters: Dict) -> str:
         """使用提示词调用LLM"""
         try:
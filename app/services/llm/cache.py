@@ -0,0 +1,207 @@
+"""
+LLM结果缓存
+
+对相同输入的LLM调用结果进行进程内缓存（LRU淘汰 + TTL过期），避免重复的网络往返；
+配置Redis后可在多个worker进程之间共享缓存结果
+"""
+
+import re
+import json
+import time
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, Hashable, Optional
+
+from config import Config
+
+try:
+    import redis
+except ImportError:
+    redis = None
+
+logger = logging.getLogger(__name__)
+
+
+class LLMResultCache:
+    """线程安全的LRU + TTL缓存"""
+
+    def __init__(self, max_size: int = 1024, ttl: float = 3600):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.RLock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """获取缓存值，不存在或已过期时返回None"""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            value, expires_at = entry
+            if expires_at < time.monotonic():
+                del self._data[key]
+                self.misses += 1
+                return None
+
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: Hashable, value: Any):
+        """写入缓存，超出容量时淘汰最久未使用的条目"""
+        with self._lock:
+            self._data[key] = (value, time.monotonic() + self.ttl)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        """清空缓存"""
+        with self._lock:
+            self._data.clear()
+            self.hits = 0
+            self.misses = 0
+            self.evictions = 0
+
+    def get_stats(self) -> dict:
+        """获取缓存统计信息"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._data),
+                'max_size': self.max_size,
+                'ttl': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0
+            }
+
+
+_redis_clients = {}
+_redis_clients_lock = threading.Lock()
+
+def get_redis_client(url: str):
+    """获取指定地址的Redis客户端（按地址复用），未配置地址或未安装redis包时返回None"""
+    if not url:
+        return None
+    if redis is None:
+        logger.warning("已配置Redis缓存地址，但未安装redis包，仅使用进程内缓存")
+        return None
+
+    client = _redis_clients.get(url)
+    if client is None:
+        with _redis_clients_lock:
+            client = _redis_clients.get(url)
+            if client is None:
+                # 超时设置较短：Redis不可用时快速降级为不使用共享缓存
+                client = _redis_clients[url] = redis.Redis.from_url(
+                    url, socket_timeout=0.2, socket_connect_timeout=0.2
+                )
+    return client
+
+
+class RedisBackedCache(LLMResultCache):
+    """进程内LRU + TTL缓存，未命中时读取Redis共享缓存，写入时同步写入Redis
+
+    缓存值需可JSON序列化（元组读回后为列表）；Redis出错时只记录日志，不影响调用方。
+    """
+
+    def __init__(self, redis_client, key_prefix: str, max_size: int = 1024, ttl: float = 3600):
+        super().__init__(max_size=max_size, ttl=ttl)
+        self.redis = redis_client
+        self.key_prefix = key_prefix
+        self.shared_hits = 0
+
+    def _redis_key(self, key: Hashable) -> str:
+        return self.key_prefix + content_hash(repr(key))
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        value = super().get(key)
+        if value is not None:
+            return value
+
+        try:
+            payload = self.redis.get(self._redis_key(key))
+        except Exception as e:
+            logger.debug(f"读取Redis共享缓存失败: {e}")
+            return None
+        if payload is None:
+            return None
+
+        value = json.loads(payload)
+        # 回填进程内缓存，后续相同请求无需再访问Redis
+        super().set(key, value)
+        with self._lock:
+            self.shared_hits += 1
+        return value
+
+    def set(self, key: Hashable, value: Any):
+        super().set(key, value)
+        try:
+            self.redis.setex(self._redis_key(key), int(self.ttl),
+                             json.dumps(value, ensure_ascii=False, default=str))
+        except Exception as e:
+            logger.debug(f"写入Redis共享缓存失败: {e}")
+
+    def get_stats(self) -> dict:
+        stats = super().get_stats()
+        stats['shared_backend'] = 'redis'
+        stats['shared_hits'] = self.shared_hits  # 进程内未命中、由Redis命中的次数
+        return stats
+
+
+_WHITESPACE_RE = re.compile(r'\s+')
+
+def normalize_query(query: str) -> str:
+    """规范化查询文本（去除首尾空白、合并连续空白），使仅空白格式不同的查询命中同一缓存
+
+    不忽略大小写：关键词提取、意图参数（文件夹/文件名）和响应中回显的查询都保留原始大小写，
+    且Milvus的like过滤区分大小写，大小写不同的查询不能共用结果
+    """
+    return _WHITESPACE_RE.sub(' ', (query or '').strip())
+
+
+def content_hash(text: str) -> str:
+    """计算长文本（如答案生成上下文）的摘要，用作缓存键的一部分"""
+    return hashlib.blake2b((text or '').encode('utf-8'), digest_size=16).hexdigest()
+
+
+# 全局缓存实例
+_llm_cache = None
+_llm_cache_lock = threading.Lock()
+
+def get_llm_cache() -> Optional[LLMResultCache]:
+    """获取全局LLM结果缓存，未启用缓存时返回None"""
+    global _llm_cache
+
+    if not Config.ENABLE_LLM_CACHE:
+        return None
+
+    if _llm_cache is None:
+        with _llm_cache_lock:
+            if _llm_cache is None:
+                redis_client = get_redis_client(Config.LLM_CACHE_REDIS_URL)
+                if redis_client is not None:
+                    _llm_cache = RedisBackedCache(
+                        redis_client, 'docmanage:llm:',
+                        max_size=Config.LLM_CACHE_MAX_SIZE,
+                        ttl=Config.LLM_CACHE_TTL
+                    )
+                else:
+                    _llm_cache = LLMResultCache(
+                        max_size=Config.LLM_CACHE_MAX_SIZE,
+                        ttl=Config.LLM_CACHE_TTL
+                    )
+                logger.info(f"LLM结果缓存已启用 - 容量: {Config.LLM_CACHE_MAX_SIZE}, TTL: {Config.LLM_CACHE_TTL}秒, "
+                            f"Redis共享: {'是' if redis_client is not None else '否'}")
+
+    return _llm_cache
@@ -6,9 +6,9 @@ DeepSeek客户端实现
 
 import logging
 import re
-from typing import List, Dict
+from typing import List, Dict, Iterator
 from config import Config
-from ..base_client import BaseLLMClient
+from ..base_client import BaseLLMClient, FallbackAnswer
 
 logger = logging.getLogger(__name__)
 
@@ -144,8 +144,8 @@ class DeepSeekClient(BaseLLMClient):
         """获取意图相关的排序指导 - 已弃用，保留兼容性"""
         return self._get_simple_guidance(intent)
     
-    def generate_answer(self, query: str, context: str, scenario: str = None, style: str = None) -> str:
-        """DeepSeek答案生成"""
+    def _build_answer_data(self, query: str, context: str, style: str = None):
+        """构建答案生成请求，返回(请求数据, 是否为普通聊天模式)"""
         
         # 判断是否是普通聊天模式（context为空或style为conversational）
         is_conversational = not context.strip() or style == "conversational"
@@ -166,20 +166,30 @@ class DeepSeekClient(BaseLLMClient):
 
 答案："""
 
+        data = {
+            "model": self.model,
+            "messages": [{"role": "user", "content": prompt}],
+            "max_tokens": 300,
+            "temperature": 0.7
+        }
+        return data, is_conversational
+    
+    def generate_answer(self, query: str, context: str, scenario: str = None, style: str = None) -> str:
+        """DeepSeek答案生成"""
+        data, is_conversational = self._build_answer_data(query, context, style)
+
         try:
-            data = {
-                "model": self.model,
-                "messages": [{"role": "user", "content": prompt}],
-                "max_tokens": 300,
-                "temperature": 0.7
-            }
-            
             response = self._make_request(data)
             return response['choices'][0]['message']['content'].strip()
             
         except Exception as e:
             logger.error(f"DeepSeek答案生成失败: {e}")
             if is_conversational:
-                return "抱歉，我暂时无法回答您的问题。请稍后再试。"
+                return FallbackAnswer("抱歉，我暂时无法回答您的问题。请稍后再试。")
             else:
-                return "无法生成答案，请查看文档内容。" 
\ No newline at end of file
+                return FallbackAnswer("无法生成答案，请查看文档内容。")
+    
+    def generate_answer_stream(self, query: str, context: str, scenario: str = None, style: str = None) -> Iterator[str]:
+        """DeepSeek流式答案生成"""
+        data, _ = self._build_answer_data(query, context, style)
+        yield from self._stream_request(data)
@@ -8,7 +8,7 @@ import logging
 import requests
 from typing import List, Dict
 from config import Config
-from ..base_client import BaseLLMClient
+from ..base_client import BaseLLMClient, FallbackAnswer
 
 logger = logging.getLogger(__name__)
 
@@ -33,7 +33,7 @@ class OllamaClient(BaseLLMClient):
             if headers:
                 default_headers.update(headers)
             
-            response = requests.post(
+            response = self.session.post(
                 f"{self.base_url}/api/chat",
                 json=data,
                 headers=default_headers,
@@ -197,6 +197,6 @@ class OllamaClient(BaseLLMClient):
         except Exception as e:
             logger.error(f"Ollama答案生成失败: {e}")
             if is_conversational:
-                return "抱歉，我暂时无法回答您的问题。请稍后再试。"
+                return FallbackAnswer("抱歉，我暂时无法回答您的问题。请稍后再试。")
             else:
-                return "抱歉，无法生成答案。" 
\ No newline at end of file
+                return FallbackAnswer("抱歉，无法生成答案。") 
\ No newline at end of file
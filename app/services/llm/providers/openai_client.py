@@ -5,9 +5,9 @@ OpenAI客户端实现
 """
 
 import logging
-from typing import List, Dict
+from typing import List, Dict, Iterator
 from config import Config
-from ..base_client import BaseLLMClient
+from ..base_client import BaseLLMClient, FallbackAnswer
 
 logger = logging.getLogger(__name__)
 
@@ -256,21 +256,25 @@ class OpenAIClient(BaseLLMClient):
         
         return base_prompt + guideline + "\n\n请仅返回重新排序后的序号列表，用逗号分隔（如：3,1,4,2,5）："
     
+    def _get_answer_prompt_config(self, query: str, context: str, scenario: str = None, style: str = None) -> Dict:
+        """获取答案生成的配置化提示词"""
+        # 使用智能意图分析推荐最佳配置
+        if not scenario and not style:
+            intent_analysis = self.prompt_service.analyze_query_intent(query)
+            scenario = intent_analysis.get('scenario')
+            style = intent_analysis.get('answer_template', 'structured_answer')
+            logger.info(f"智能推荐答案风格 - 场景: {scenario}, 风格: {style}")
+        
+        return self.prompt_service.get_result_assembly_prompt(
+            query, context, scenario=scenario, template=style or 'structured_answer'
+        )
+    
     def generate_answer(self, query: str, context: str, scenario: str = None, style: str = None) -> str:
         """基于检索结果生成答案"""
         try:
             if self.prompt_service:
-                # 使用智能意图分析推荐最佳配置
-                if not scenario and not style:
-                    intent_analysis = self.prompt_service.analyze_query_intent(query)
-                    scenario = intent_analysis.get('scenario')
-                    style = intent_analysis.get('answer_template', 'structured_answer')
-                    logger.info(f"智能推荐答案风格 - 场景: {scenario}, 风格: {style}")
-                
                 # 获取配置化提示词
-                prompt_config = self.prompt_service.get_result_assembly_prompt(
-                    query, context, scenario=scenario, template=style or 'structured_answer'
-                )
+                prompt_config = self._get_answer_prompt_config(query, context, scenario, style)
                 
                 answer = self._call_llm_with_prompt(
                     prompt_config['system_prompt'],
@@ -286,7 +290,24 @@ class OpenAIClient(BaseLLMClient):
                 
         except Exception as e:
             logger.error(f"答案生成失败: {e}")
-            return f"抱歉，生成答案时出现错误：{str(e)}"
+            return FallbackAnswer(f"抱歉，生成答案时出现错误：{str(e)}")
+    
+    def generate_answer_stream(self, query: str, context: str, scenario: str = None, style: str = None) -> Iterator[str]:
+        """流式答案生成，未配置提示词服务时降级为一次性返回"""
+        if not self.prompt_service:
+            yield self._fallback_generate_answer(query, context)
+            return
+        
+        prompt_config = self._get_answer_prompt_config(query, context, scenario, style)
+        data = {
+            "model": self.model,
+            "messages": [
+                {"role": "system", "content": prompt_config['system_prompt']},
+                {"role": "user", "content": prompt_config['user_prompt']}
+            ],
+            **prompt_config['parameters']
+        }
+        yield from self._stream_request(data)
     
     def _fallback_generate_answer(self, query: str, context: str) -> str:
         """备用答案生成方法"""
@@ -329,6 +350,6 @@ class OpenAIClient(BaseLLMClient):
         except Exception as e:
             logger.error(f"备用答案生成失败: {e}")
             if is_conversational:
-                return "抱歉，我暂时无法回答您的问题。请稍后再试。"
+                return FallbackAnswer("抱歉，我暂时无法回答您的问题。请稍后再试。")
             else:
-                return "抱歉，无法生成答案，请查看检索到的文档内容。" 
\ No newline at end of file
+                return FallbackAnswer("抱歉，无法生成答案，请查看检索到的文档内容。") 
\ No newline at end of file
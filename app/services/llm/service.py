@@ -7,9 +7,11 @@ LLM服务统一接口
 import json
 import logging
 from datetime import datetime
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Iterator
 from config import Config
 from .factory import LLMClientFactory
+from .base_client import FallbackAnswer
+from .cache import get_llm_cache, content_hash, normalize_query
 
 logger = logging.getLogger(__name__)
 
@@ -98,11 +100,21 @@ class LLMService:
         if not Config.ENABLE_LLM_QUERY_OPTIMIZATION or not llm_model:
             return query
         
+        cache = get_llm_cache()
+        cache_key = ('optimize_query', normalize_query(query), llm_model, scenario, template)
+        if cache is not None:
+            cached = cache.get(cache_key)
+            if cached is not None:
+                return cached
+        
         client = LLMClientFactory.create_client(llm_model)
         if not client:
             return query
         
-        return client.optimize_query(query, scenario=scenario, template=template)
+        optimized = client.optimize_query(query, scenario=scenario, template=template)
+        if cache is not None and optimized:
+            cache.set(cache_key, optimized)
+        return optimized
     
     @staticmethod
     def rerank_results(query: str, results: List[Dict], llm_model: str = None) -> List[Dict]:
@@ -135,18 +147,27 @@ class LLMService:
                     'original_index': i
                 })
             
+            # 相同查询与相同候选摘要的重排序结果可直接复用，缓存原始下标顺序
+            cache = get_llm_cache()
+            cache_key = ('rerank_file_results', normalize_query(query), llm_model,
+                         content_hash('\n'.join(item['text'] for item in temp_results)))
+            if cache is not None:
+                cached_order = cache.get(cache_key)
+                if cached_order is not None:
+                    return [file_results[index] for index in cached_order]
+            
             # 使用现有的重排序逻辑
             client = LLMClientFactory.create_client(llm_model)
             if client:
                 reranked_temp = client.rerank_results(query, temp_results)
                 
                 # 根据重排序结果重新排列文件结果
-                reranked_files = []
-                for temp_result in reranked_temp:
-                    original_index = temp_result['original_index']
-                    reranked_files.append(file_results[original_index])
+                order = [temp_result['original_index'] for temp_result in reranked_temp]
+                # 客户端失败时会原样返回输入列表，此时不写入缓存
+                if cache is not None and reranked_temp is not temp_results:
+                    cache.set(cache_key, tuple(order))
                 
-                return reranked_files
+                return [file_results[index] for index in order]
             
         except Exception as e:
             logger.error(f"文件级别重排序失败: {e}")
@@ -159,11 +180,56 @@ class LLMService:
         if not Config.ENABLE_LLM_ANSWER_GENERATION or not llm_model:
             return None
         
+        cache = get_llm_cache()
+        cache_key = LLMService._answer_cache_key(query, context, llm_model, scenario, style)
+        if cache is not None:
+            cached = cache.get(cache_key)
+            if cached is not None:
+                return cached
+        
         client = LLMClientFactory.create_client(llm_model)
         if not client:
             return None
         
-        return client.generate_answer(query, context, scenario=scenario, style=style)
+        answer = client.generate_answer(query, context, scenario=scenario, style=style)
+        # 调用失败时客户端返回降级提示文本，不写入缓存，下次请求重新调用LLM
+        if cache is not None and answer and not isinstance(answer, FallbackAnswer):
+            cache.set(cache_key, answer)
+        return answer
+    
+    @staticmethod
+    def generate_answer_stream(query: str, context: str, llm_model: str = None, scenario: str = None, style: str = None) -> Iterator[str]:
+        """流式答案生成，逐段返回答案文本；完整答案写入与generate_answer共用的缓存"""
+        if not Config.ENABLE_LLM_ANSWER_GENERATION or not llm_model:
+            return
+        
+        cache = get_llm_cache()
+        cache_key = LLMService._answer_cache_key(query, context, llm_model, scenario, style)
+        if cache is not None:
+            cached = cache.get(cache_key)
+            if cached is not None:
+                yield cached
+                return
+        
+        client = LLMClientFactory.create_client(llm_model)
+        if not client:
+            return
+        
+        parts = []
+        failed = False
+        for delta in client.generate_answer_stream(query, context, scenario=scenario, style=style):
+            failed = failed or isinstance(delta, FallbackAnswer)
+            parts.append(delta)
+            yield delta
+        
+        answer = ''.join(parts)
+        if cache is not None and answer and not failed:
+            cache.set(cache_key, answer)
+    
+    @staticmethod
+    def _answer_cache_key(query: str, context: str, llm_model: str, scenario: str, style: str) -> tuple:
+        """答案生成缓存键，上下文可能很长，以摘要代替原文"""
+        return ('generate_answer', normalize_query(query), content_hash(context), llm_model, scenario, style)
 
     @staticmethod
     def analyze_document_structure(document_name: str, document_tags: List[Dict], 
@@ -336,6 +402,14 @@ class LLMService:
         if not llm_model:
             llm_model = f"{Config.DEFAULT_LLM_PROVIDER}:{Config.DEFAULT_LLM_MODEL}"
         
+        # 只缓存LLM成功提取的结果，备用提取的结果不缓存
+        cache = get_llm_cache()
+        cache_key = ('extract_search_keywords', normalize_query(query), llm_model)
+        if cache is not None:
+            cached = cache.get(cache_key)
+            if cached is not None:
+                return dict(cached)
+        
         client = LLMClientFactory.create_client(llm_model)
         if not client:
             logger.warning(f"无法创建LLM客户端: {llm_model}，使用备用关键词提取")
@@ -407,6 +481,8 @@ class LLMService:
                 }
                 
                 logger.info(f"LLM关键词提取成功 - 原查询: {query}, 关键词: {result['keywords']}")
+                if cache is not None:
+                    cache.set(cache_key, dict(result))
                 return result
                 
             except json.JSONDecodeError as e:
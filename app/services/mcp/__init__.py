@@ -4,13 +4,17 @@
 """
 
 from .clients.mcp_client import MCPClient
-from .servers.mcp_manager import MCPManager
+from .servers.mcp_manager import MCPManager, get_mcp_manager, ensure_mcp_initialized
+from .event_loop import run_coroutine
 from .tools.tool_registry import ToolRegistry
 from .config.mcp_config import MCPConfig
 
 __all__ = [
     'MCPClient',
     'MCPManager', 
+    'get_mcp_manager',
+    'ensure_mcp_initialized',
+    'run_coroutine',
     'ToolRegistry',
     'MCPConfig'
 ] 
\ No newline at end of file
@@ -0,0 +1,34 @@
+"""
+MCP后台事件循环
+所有MCP协程都提交到同一个常驻事件循环中执行，避免每次调用都创建和关闭事件循环；
+MCP客户端建立的连接也因此始终绑定在同一个循环上，可以跨请求复用
+"""
+
+import asyncio
+import logging
+import threading
+from typing import Any, Coroutine, Optional
+
+logger = logging.getLogger(__name__)
+
+_loop = None
+_loop_lock = threading.Lock()
+
+def get_event_loop() -> asyncio.AbstractEventLoop:
+    """获取后台事件循环，首次调用时在守护线程中启动"""
+    global _loop
+
+    if _loop is None:
+        with _loop_lock:
+            if _loop is None:
+                # 事件循环策略在应用创建时设置（安装uvloop时使用其实现）
+                loop = asyncio.new_event_loop()
+                threading.Thread(target=loop.run_forever, name='mcp-event-loop', daemon=True).start()
+                _loop = loop
+                logger.info("MCP后台事件循环已启动")
+
+    return _loop
+
+def run_coroutine(coro: Coroutine, timeout: Optional[float] = None) -> Any:
+    """在后台事件循环中执行协程并阻塞等待结果，供同步的Flask视图调用"""
+    return asyncio.run_coroutine_threadsafe(coro, get_event_loop()).result(timeout)
@@ -3,7 +3,7 @@ MCP服务器模块
 """
 
 from .document_server import DocumentMCPServer
-from .mcp_manager import MCPManager
+from .mcp_manager import MCPManager, get_mcp_manager, ensure_mcp_initialized
 from .mcp_installer import MCPInstaller
 
-__all__ = ['DocumentMCPServer', 'MCPManager', 'MCPInstaller'] 
\ No newline at end of file
+__all__ = ['DocumentMCPServer', 'MCPManager', 'MCPInstaller', 'get_mcp_manager', 'ensure_mcp_initialized'] 
\ No newline at end of file
@@ -5,10 +5,12 @@ MCP管理器
 
 import asyncio
 import logging
+import threading
 from typing import Dict, List, Any, Optional
 from ..config.mcp_config import MCPConfig, MCPServerConfig
 from ..clients.mcp_client import MCPClient, MCPTool, MCPToolResult
 from .mcp_installer import MCPInstaller
+from ..event_loop import run_coroutine
 
 logger = logging.getLogger(__name__)
 
@@ -160,4 +162,30 @@ class MCPManager:
     
     def clear_installation_cache(self):
         """清除安装状态缓存"""
-        self.installer.clear_cache()
\ No newline at end of file
+        self.installer.clear_cache()
+
+
+# 全局MCP管理器实例：客户端连接在进程内共享，只需初始化一次
+_mcp_manager = None
+_mcp_manager_lock = threading.Lock()
+_mcp_initialize_lock = threading.Lock()
+
+def get_mcp_manager() -> MCPManager:
+    """获取全局MCP管理器实例"""
+    global _mcp_manager
+
+    if _mcp_manager is None:
+        with _mcp_manager_lock:
+            if _mcp_manager is None:
+                _mcp_manager = MCPManager()
+
+    return _mcp_manager
+
+def ensure_mcp_initialized() -> bool:
+    """确保全局MCP管理器已初始化（并发请求只会触发一次初始化），返回是否可用"""
+    manager = get_mcp_manager()
+    if not manager.is_initialized:
+        with _mcp_initialize_lock:
+            if not manager.is_initialized:
+                return run_coroutine(manager.initialize())
+    return True
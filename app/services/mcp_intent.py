@@ -0,0 +1,146 @@
+"""
+MCP意图执行辅助模块
+将“意图判定 -> 工具分析 -> 工具验证 -> 工具执行”的流程集中在一处，供搜索路由复用
+"""
+
+import time
+import asyncio
+import logging
+from typing import Dict, List, Any, Tuple, Union, Collection
+
+from config import Config
+
+from app.services.mcp_tool_analyzer import create_mcp_tool_analyzer
+from app.services.mcp_tool_executor import mcp_tool_executor
+from app.services.mcp.event_loop import run_coroutine
+
+logger = logging.getLogger(__name__)
+
+# 需要通过MCP工具直接执行的操作类型
+MCP_FILE_ACTIONS = frozenset(('create_file', 'create_folder'))
+
+
+def _error_result(error: Any) -> Dict[str, Any]:
+    """构建统一格式的MCP错误结果"""
+    return {
+        'tool_name': 'error',
+        'arguments': {},
+        'result': None,
+        'error': error,
+        'timestamp': time.time()
+    }
+
+
+def is_mcp_action(intent_analysis: Dict[str, Any], confidence_threshold: float) -> bool:
+    """判断意图分析结果是否为需要执行的MCP文件操作"""
+    return (intent_analysis.get('intent_type') == 'mcp_action' and
+            intent_analysis.get('confidence', 0) > confidence_threshold and
+            intent_analysis.get('action_type') in MCP_FILE_ACTIONS)
+
+
+def detect_and_execute_mcp(query_text: str, intent_analysis: Dict[str, Any],
+                           confidence_threshold: float) -> Tuple[bool, List[Dict[str, Any]]]:
+    """
+    根据意图分析结果判定并执行MCP操作
+
+    Returns:
+        (skip_search, mcp_tool_results)：是否跳过后续搜索，以及字典形式的工具执行结果
+    """
+    if not is_mcp_action(intent_analysis, confidence_threshold):
+        return False, []
+
+    logger.info(f"执行MCP操作: {query_text}")
+
+    mcp_tool_analyzer = create_mcp_tool_analyzer()
+
+    # 1. 分析需要的工具
+    tool_analysis = mcp_tool_analyzer.analyze_tools_needed(query_text)
+
+    # 2. 验证工具可用性
+    tool_validation = mcp_tool_analyzer.validate_tools(tool_analysis.get('tools_needed', []))
+    if not tool_validation['all_valid']:
+        error_msg = mcp_tool_analyzer.get_error_message(tool_validation['error_type'], tool_validation.get('invalid_tools', []))
+        logger.warning(f"MCP工具验证失败: {error_msg}")
+        return True, [_error_result(error_msg)]
+
+    # 3. 执行工具
+    try:
+        # 在常驻的后台事件循环中执行，无需每次创建和关闭事件循环
+        tool_calls = run_coroutine(
+            mcp_tool_executor.execute_tools_from_analysis(query_text, tool_analysis)
+        )
+        # 在边界处统一转换为字典，后续处理无需再区分dataclass
+        mcp_tool_results = [tool_call.to_dict() for tool_call in tool_calls]
+        logger.info(f"基于LLM分析的MCP工具执行完成，共 {len(mcp_tool_results)} 个步骤")
+        return True, mcp_tool_results
+    except Exception as mcp_error:
+        logger.error(f"MCP工具执行失败: {mcp_error}")
+        return True, [_error_result(f"MCP工具执行失败: {str(mcp_error)}")]
+
+
+def _step_dependencies(execution_sequence: List[Dict[str, Any]], index: int):
+    """
+    获取步骤依赖的前序步骤序号：depends_on声明的依赖，加上按参数推断的依赖
+    （步骤的parent_folder为前序步骤创建的folder_name时，必须等待该步骤完成）
+
+    depends_on缺失或引用了非前序步骤时返回None
+    """
+    step = execution_sequence[index]
+    depends_on = step.get('depends_on')
+    if not isinstance(depends_on, list) or not all(
+            isinstance(dep, int) and 0 <= dep < index for dep in depends_on):
+        return None
+
+    parent_folder = (step.get('parameters') or {}).get('parent_folder')
+    inferred = [
+        dep for dep in range(index)
+        if parent_folder and (execution_sequence[dep].get('parameters') or {}).get('folder_name') == parent_folder
+    ]
+    return set(depends_on) | set(inferred)
+
+
+def plan_execution_waves(execution_sequence: List[Dict[str, Any]],
+                         parallel_safe_tools: Collection[str] = ()) -> List[List[int]]:
+    """
+    根据步骤间的依赖将执行序列划分为若干批次，同一批次内的步骤互不依赖
+
+    只有执行序列中的工具全部在parallel_safe_tools中时才会并发；否则，或任一步骤的
+    depends_on缺失/无效时，退回逐个顺序执行。
+    """
+    sequential = [[index] for index in range(len(execution_sequence))]
+    if not all(step.get('tool_name') in parallel_safe_tools for step in execution_sequence):
+        return sequential
+
+    levels = []
+    for index in range(len(execution_sequence)):
+        dependencies = _step_dependencies(execution_sequence, index)
+        if dependencies is None:
+            return sequential
+        levels.append(1 + max((levels[dep] for dep in dependencies), default=-1))
+
+    waves = [[] for _ in range(max(levels, default=-1) + 1)]
+    for index, level in enumerate(levels):
+        waves[level].append(index)
+    return waves
+
+
+async def call_tools_in_waves(mcp_manager, execution_sequence: List[Dict[str, Any]]) -> List[Union[Any, Exception, None]]:
+    """
+    按批次调用执行序列中的MCP工具，同一批次内并发执行（允许并发的工具见MCP_PARALLEL_SAFE_TOOLS配置）
+
+    Returns:
+        与execution_sequence一一对应的调用结果；调用异常时为异常对象，缺少tool_name的步骤为None
+    """
+    results = [None] * len(execution_sequence)
+    parallel_safe_tools = Config.MCP_CONFIG.get('parallel_safe_tools', frozenset())
+    for wave in plan_execution_waves(execution_sequence, parallel_safe_tools):
+        wave = [index for index in wave if execution_sequence[index].get('tool_name')]
+        for index in wave:
+            logger.info(f"执行工具: {execution_sequence[index]['tool_name']}, 参数: {execution_sequence[index].get('parameters', {})}")
+        wave_results = await asyncio.gather(*[
+            mcp_manager.call_tool(execution_sequence[index]['tool_name'], execution_sequence[index].get('parameters', {}))
+            for index in wave
+        ], return_exceptions=True)
+        for index, result in zip(wave, wave_results):
+            results[index] = result
+    return results
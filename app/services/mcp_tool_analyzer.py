@@ -8,6 +8,7 @@ import json
 import logging
 import yaml
 import os
+import threading
 from typing import Dict, List, Any, Optional
 from pathlib import Path
 
@@ -152,7 +153,8 @@ class MCPToolAnalyzer:
       "description": "执行描述",
       "parameters": {{
         "参数名": "从用户请求中提取的具体参数值"
-      }}
+      }},
+      "depends_on": []
     }}
   ]
 }}
@@ -163,6 +165,7 @@ class MCPToolAnalyzer:
 3. 所有字符串必须用双引号包围
 4. 数组和对象的语法必须正确
 5. 每行末尾不要有多余的逗号
+6. depends_on 列出该步骤依赖的前序步骤序号（从0开始），无依赖时为 []；在某文件夹下创建内容时必须依赖创建该文件夹的步骤
 
 当前可用的MCP工具及其参数：
 
@@ -188,7 +191,8 @@ class MCPToolAnalyzer:
       "parameters": {{
         "folder_name": "test1",
         "parent_folder": "test"
-      }}
+      }},
+      "depends_on": []
     }},
     {{
       "tool_name": "create_folder", 
@@ -196,7 +200,8 @@ class MCPToolAnalyzer:
       "parameters": {{
         "folder_name": "test2",
         "parent_folder": "test"
-      }}
+      }},
+      "depends_on": []
     }},
     {{
       "tool_name": "create_file",
@@ -204,7 +209,8 @@ class MCPToolAnalyzer:
       "parameters": {{
         "file_name": "1.txt",
         "parent_folder": "test1"
-      }}
+      }},
+      "depends_on": [0]
     }}
   ]
 }}"""
@@ -531,20 +537,32 @@ class MCPToolAnalyzer:
         
         return result
 
+# 绑定全局MCP管理器的工具分析器实例（配置只加载一次，LLM客户端跨请求复用）
+_shared_analyzer = None
+_shared_analyzer_lock = threading.Lock()
+
 # 工厂函数，用于创建带有MCP管理器的工具分析器实例
 def create_mcp_tool_analyzer(mcp_manager=None):
     """
-    创建MCP工具分析器实例
+    获取MCP工具分析器实例
     Args:
-        mcp_manager: MCP管理器实例，如果为None则创建一个新的
+        mcp_manager: MCP管理器实例，为None或全局管理器时返回共享实例
     Returns:
         MCPToolAnalyzer: 工具分析器实例
     """
-    if mcp_manager is None:
-        from app.services.mcp.servers.mcp_manager import MCPManager
-        mcp_manager = MCPManager()
+    global _shared_analyzer
+    from app.services.mcp.servers.mcp_manager import get_mcp_manager
+    
+    shared_manager = get_mcp_manager()
+    if mcp_manager is not None and mcp_manager is not shared_manager:
+        return MCPToolAnalyzer(mcp_manager)
+    
+    if _shared_analyzer is None:
+        with _shared_analyzer_lock:
+            if _shared_analyzer is None:
+                _shared_analyzer = MCPToolAnalyzer(shared_manager)
     
-    return MCPToolAnalyzer(mcp_manager)
+    return _shared_analyzer
 
 # 为了保持向后兼容性，创建一个全局实例（但不推荐使用）
 # 建议使用 create_mcp_tool_analyzer() 函数创建实例
@@ -8,7 +8,7 @@ import logging
 import time
 import re
 from typing import Dict, List, Any, Optional
-from dataclasses import dataclass
+from dataclasses import dataclass, asdict
 from .mcp.servers.mcp_installer import MCPInstaller
 
 logger = logging.getLogger(__name__)
@@ -25,6 +25,10 @@ class MCPToolCall:
     def __post_init__(self):
         if self.timestamp is None:
             self.timestamp = time.time()
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """转换为字典格式"""
+        return asdict(self)
 
 class MCPToolExecutor:
     """基于LLM分析结果的MCP工具执行器"""
@@ -4,13 +4,16 @@
 """
 
 from .base_vectorizer import BaseVectorizer
+from .search_cache import get_index_generation
 from .pdf_vectorizer import PDFVectorizer
 from .word_vectorizer import WordVectorizer
 from .excel_vectorizer import ExcelVectorizer
 from .image_vectorizer import ImageVectorizer
 from .video_vectorizer import VideoVectorizer
 from .vectorization_factory import VectorizationFactory
-from .vector_service_adapter import VectorServiceAdapter
+from .vector_service_adapter import (
+    VectorServiceAdapter, get_vector_service, get_vector_service_config, get_configured_vector_service
+)
 
 __all__ = [
     'BaseVectorizer',
@@ -20,5 +23,9 @@ __all__ = [
     'ImageVectorizer',
     'VideoVectorizer',
     'VectorizationFactory',
-    'VectorServiceAdapter'
+    'VectorServiceAdapter',
+    'get_vector_service',
+    'get_vector_service_config',
+    'get_configured_vector_service',
+    'get_index_generation'
 ] 
\ No newline at end of file
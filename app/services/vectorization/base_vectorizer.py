@@ -10,9 +10,14 @@ import os
 import uuid
 from datetime import datetime
 import threading
+import numpy as np
 
 # 导入torch配置模块
 from ..torch_config import configure_torch_for_cpu_gpu_compatibility
+from ..llm.cache import LLMResultCache
+from .search_cache import (
+    get_index_generation, bump_index_generation, get_cached_search_results, cache_search_results
+)
 
 logger = logging.getLogger(__name__)
 
@@ -20,6 +25,51 @@ logger = logging.getLogger(__name__)
 _model_instance = None
 _model_lock = threading.Lock()
 
+# 查询向量缓存（LRU），重复查询无需再次执行模型推理；仅用于搜索查询，不缓存文档分块
+QUERY_VECTOR_CACHE_SIZE = int(os.getenv('QUERY_VECTOR_CACHE_SIZE', '1024'))
+# 查询向量不会过期（模型不变时编码结果固定），只按容量淘汰
+_query_vector_cache = LLMResultCache(max_size=QUERY_VECTOR_CACHE_SIZE, ttl=float('inf'))
+
+def get_query_vector_cache_stats() -> Optional[Dict[str, Any]]:
+    """获取查询向量缓存统计信息，未启用时返回None"""
+    if QUERY_VECTOR_CACHE_SIZE <= 0:
+        return None
+    stats = _query_vector_cache.get_stats()
+    stats['ttl'] = None  # 不过期（避免JSON中出现Infinity）
+    return stats
+
+# 向量索引类型：IVF_FLAT（默认）、IVF_SQ8（int8标量量化，内存约为1/4）、IVF_PQ（PQ压缩）、HNSW（图索引，查询更快）
+# 只影响新建集合；已有集合需删除后重新向量化才会使用新的索引
+MILVUS_INDEX_TYPE = os.getenv('MILVUS_INDEX_TYPE', 'IVF_FLAT').upper()
+
+# 量化索引返回近似得分：多取SEARCH_REFINE_FACTOR倍候选，用原始FP32向量精确计算余弦相似度后再截取top_k
+QUANTIZED_INDEX_TYPES = ('IVF_SQ8', 'IVF_PQ')
+SEARCH_REFINE_FACTOR = int(os.getenv('MILVUS_SEARCH_REFINE_FACTOR', '3'))
+
+def build_index_params(nlist: int = 128) -> Dict[str, Any]:
+    """根据MILVUS_INDEX_TYPE构建建索引参数"""
+    if MILVUS_INDEX_TYPE == 'HNSW':
+        params = {"M": 16, "efConstruction": 200}
+    elif MILVUS_INDEX_TYPE == 'IVF_SQ8':
+        params = {"nlist": nlist}
+    elif MILVUS_INDEX_TYPE == 'IVF_PQ':
+        # m需整除向量维度，384/768维模型均满足m=8
+        params = {"nlist": nlist, "m": 8, "nbits": 8}
+    else:
+        return {"metric_type": "COSINE", "index_type": "IVF_FLAT", "params": {"nlist": nlist}}
+    return {"metric_type": "COSINE", "index_type": MILVUS_INDEX_TYPE, "params": params}
+
+def build_search_params(index_type: str) -> Dict[str, Any]:
+    """根据集合实际的索引类型构建查询参数"""
+    if index_type == 'HNSW':
+        params = {"ef": 64}
+    elif index_type in QUANTIZED_INDEX_TYPES:
+        # 量化索引为近似距离，多探查一些聚类单元以弥补召回损失
+        params = {"nprobe": 16}
+    else:
+        params = {"nprobe": 10}
+    return {"metric_type": "COSINE", "params": params}
+
 class BaseVectorizer(ABC):
     """基础向量化器抽象类"""
     
@@ -100,6 +150,7 @@ class BaseVectorizer(ABC):
             # 删除现有集合
             if utility.has_collection(self.collection_name):
                 utility.drop_collection(self.collection_name)
+                bump_index_generation()
                 logger.info(f"✅ 已删除集合 '{self.collection_name}'")
             
             # 更新维度为模型实际维度
@@ -135,11 +186,7 @@ class BaseVectorizer(ABC):
             collection = Collection(self.collection_name, schema)
             
             # 创建索引
-            index_params = {
-                "metric_type": "COSINE",
-                "index_type": "IVF_FLAT",
-                "params": {"nlist": 128}
-            }
+            index_params = build_index_params()
             
             collection.create_index("vector", index_params)
             logger.info(f"✅ 创建集合 '{self.collection_name}' 成功，维度: {dimension}")
@@ -310,11 +357,7 @@ class BaseVectorizer(ABC):
             collection = Collection(self.collection_name, schema)
             
             # 创建索引
-            index_params = {
-                "metric_type": "COSINE",
-                "index_type": "IVF_FLAT",
-                "params": {"nlist": 128}
-            }
+            index_params = build_index_params()
             
             collection.create_index("vector", index_params)
             logger.info(f"✅ Created collection '{self.collection_name}' with index")
@@ -384,6 +427,7 @@ class BaseVectorizer(ABC):
             # 直接使用字典列表格式 - pymilvus 2.5.x 的正确格式
             result = collection.insert(vectors_data)
             collection.flush()
+            bump_index_generation()
             
             logger.info(f"✅ Inserted {len(vectors_data)} vectors into collection")
             return True
@@ -392,28 +436,67 @@ class BaseVectorizer(ABC):
             logger.error(f"Failed to insert vectors: {e}")
             return False
     
+    def _get_search_params(self, collection) -> Dict[str, Any]:
+        """获取与集合索引匹配的查询参数（按实例缓存索引类型）"""
+        index_type = getattr(self, '_index_type', None)
+        if index_type is None:
+            try:
+                index_type = collection.indexes[0].params.get('index_type', 'IVF_FLAT') if collection.indexes else 'IVF_FLAT'
+            except Exception as e:
+                logger.warning(f"获取集合索引类型失败，按IVF_FLAT处理: {e}")
+                index_type = 'IVF_FLAT'
+            self._index_type = index_type
+        return build_search_params(index_type)
+    
+    def encode_query(self, query_text: str) -> Optional[List[float]]:
+        """编码搜索查询，结果按(模型, 查询文本)缓存"""
+        current_model = self.model or _model_instance
+        if not self.is_available or not current_model or QUERY_VECTOR_CACHE_SIZE <= 0:
+            return self.encode_text(query_text)
+        
+        query_text = query_text.strip()
+        key = (id(current_model), query_text)
+        vector = _query_vector_cache.get(key)
+        if vector is not None:
+            return vector
+        
+        vector = self.encode_text(query_text)
+        # 编码失败时encode_text返回零向量，不写入缓存
+        if vector and any(vector):
+            _query_vector_cache.set(key, vector)
+        return vector
+    
     def search_similar(self, query_text: str, top_k: int = 10, document_id: str = None, min_score: float = 0.0) -> List[Dict[str, Any]]:
         """搜索相似文档"""
+        results = self.search_similar_batch([query_text], top_k, document_id, min_score)
+        return results[0] if results else []
+
+    def search_similar_batch(self, query_texts: List[str], top_k: int = 10, document_id: str = None, min_score: float = 0.0) -> List[List[Dict[str, Any]]]:
+        """批量搜索相似文档：多个查询向量通过一次Milvus请求（nq>1）检索，返回与query_texts一一对应的结果列表"""
         if not self.is_available:
             logger.info("Vector search skipped - service not available")
             return []
             
+        cache_key = ('similar', self.collection_name, tuple(query_text.strip() for query_text in query_texts),
+                     top_k, document_id, min_score, get_index_generation())
+        cached = get_cached_search_results(cache_key)
+        if cached is not None:
+            return cached
+            
         try:
             from pymilvus import Collection
             
             # 编码查询文本
-            query_vector = self.encode_text(query_text)
-            if not query_vector:
+            query_vectors = [self.encode_query(query_text) for query_text in query_texts]
+            if not query_vectors or not all(query_vectors):
                 return []
             
             collection = Collection(self.collection_name)
             collection.load()
             
             # 搜索参数
-            search_params = {
-                "metric_type": "COSINE",
-                "params": {"nprobe": 10}
-            }
+            search_params = self._get_search_params(collection)
+            refine = self._index_type in QUANTIZED_INDEX_TYPES and SEARCH_REFINE_FACTOR > 1
             
             # 构建过滤表达式
             expr = None
@@ -421,20 +504,26 @@ class BaseVectorizer(ABC):
                 expr = f'document_id == "{document_id}"'
             
             # 执行搜索
+            output_fields = ["document_id", "chunk_id", "text"]
             results = collection.search(
-                data=[query_vector],
+                data=query_vectors,
                 anns_field="vector",
                 param=search_params,
-                limit=top_k,
+                limit=top_k * SEARCH_REFINE_FACTOR if refine else top_k,
                 expr=expr,
-                output_fields=["document_id", "chunk_id", "text"]
+                output_fields=output_fields + ["vector"] if refine else output_fields
             )
             
             # 处理结果，添加相似度阈值过滤
-            similar_docs = []
-            for hits in results:
-                for hit in hits:
-                    score = float(hit.score)
+            batch_docs = []
+            for query_vector, hits in zip(query_vectors, results):
+                if refine:
+                    scored_hits = self._refine_hits(hits, query_vector, top_k)
+                else:
+                    scored_hits = ((float(hit.score), hit) for hit in hits)
+                
+                similar_docs = []
+                for score, hit in scored_hits:
                     # 只返回相似度大于等于阈值的结果
                     if score >= min_score:
                         similar_docs.append({
@@ -443,31 +532,52 @@ class BaseVectorizer(ABC):
                             "text": hit.entity.get("text"),
                             "score": score
                         })
+                batch_docs.append(similar_docs)
             
-            logger.info(f"Found {len(similar_docs)} similar documents (filtered by min_score={min_score})")
-            return similar_docs
+            logger.info(f"Found {[len(docs) for docs in batch_docs]} similar documents for {len(query_texts)} queries (filtered by min_score={min_score})")
+            cache_search_results(cache_key, batch_docs)
+            return batch_docs
             
         except Exception as e:
             logger.error(f"Failed to search similar documents: {e}")
             return []
 
+    def _refine_hits(self, hits, query_vector: List[float], top_k: int) -> List[Tuple[float, Any]]:
+        """用原始FP32向量精确计算候选与查询的余弦相似度，按得分降序返回前top_k个(得分, hit)"""
+        hits = list(hits)
+        if not hits:
+            return []
+        
+        vectors = np.asarray([hit.entity.get("vector") for hit in hits], dtype=np.float32)
+        query = np.asarray(query_vector, dtype=np.float32)
+        norms = np.linalg.norm(vectors, axis=1) * np.linalg.norm(query)
+        scores = vectors @ query / np.where(norms > 0, norms, 1.0)
+        
+        order = np.argsort(-scores, kind='stable')[:top_k]
+        return [(float(scores[i]), hits[i]) for i in order]
+
     def search_by_keywords(self, query_text: str, top_k: int = 10, document_id: str = None) -> List[Dict[str, Any]]:
         """基于关键词的文本搜索（补充语义搜索）"""
         if not self.is_available:
             logger.info("Keyword search skipped - service not available")
             return []
+        
+        cache_key = ('keywords', self.collection_name, query_text.strip(), top_k, document_id, get_index_generation())
+        cached = get_cached_search_results(cache_key)
+        if cached is not None:
+            return cached[0]
             
         try:
             from pymilvus import Collection
             
-            collection = Collection(self.collection_name)
-            collection.load()
-            
-            # 提取查询关键词
+            # 先提取查询关键词，没有关键词时无需访问Milvus
             keywords = self._extract_query_keywords(query_text)
             if not keywords:
                 return []
             
+            collection = Collection(self.collection_name)
+            collection.load()
+            
             # 构建关键词匹配表达式
             keyword_expressions = []
             for keyword in keywords:
@@ -513,7 +623,9 @@ class BaseVectorizer(ABC):
             keyword_docs.sort(key=lambda x: x["score"], reverse=True)
             
             logger.info(f"关键词搜索找到 {len(keyword_docs)} 个匹配结果")
-            return keyword_docs[:top_k]
+            keyword_docs = keyword_docs[:top_k]
+            cache_search_results(cache_key, [keyword_docs])
+            return keyword_docs
             
         except Exception as e:
             logger.error(f"关键词搜索失败: {e}")
@@ -599,6 +711,7 @@ class BaseVectorizer(ABC):
             expr = f'document_id == "{document_id}"'
             collection.delete(expr)
             collection.flush()
+            bump_index_generation()
             
             logger.info(f"✅ Deleted vectors for document {document_id}")
             return True
@@ -655,6 +768,9 @@ class BaseVectorizer(ABC):
                 stats["index_type"] = "unknown"
                 stats["metric_type"] = "unknown"
             
+            # 量化索引的得分是否经过FP32精确重算：为True时得分与IVF_FLAT同为余弦相似度，min_score阈值无需按精度调整
+            stats["score_refined"] = stats["index_type"] in QUANTIZED_INDEX_TYPES and SEARCH_REFINE_FACTOR > 1
+            
             logger.info(f"Collection stats: {stats}")
             return stats
             
@@ -0,0 +1,79 @@
+"""
+检索结果缓存
+进程内LRU缓存 + 可选的Redis共享缓存，使多个worker进程之间复用相同查询的Milvus检索结果
+"""
+
+import os
+import logging
+import threading
+from typing import Any, Dict, List, Optional
+
+from ..llm.cache import LLMResultCache, RedisBackedCache, get_redis_client
+
+logger = logging.getLogger(__name__)
+
+# 向量数据版本号：每次插入、删除向量或重建集合后递增，上层缓存据此判断检索结果是否可能变化
+_index_generation = 0
+_index_generation_lock = threading.Lock()
+
+# 检索结果缓存（LRU + TTL）：相同查询参数在向量数据未变化时直接返回上次的Milvus结果，
+# 缓存键包含向量数据版本号，插入/删除向量后旧条目自然失效
+SEARCH_RESULT_CACHE_SIZE = int(os.getenv('SEARCH_RESULT_CACHE_SIZE', '2000'))
+SEARCH_RESULT_CACHE_TTL = int(os.getenv('SEARCH_RESULT_CACHE_TTL', '300'))
+
+# Redis共享缓存地址（如 redis://localhost:6379/0），为空时仅使用进程内缓存
+# 启用后向量数据版本号也保存在Redis中，任一worker写入向量都会使所有worker的旧缓存失效
+SEARCH_CACHE_REDIS_URL = os.getenv('SEARCH_CACHE_REDIS_URL', '').strip()
+_REDIS_GENERATION_KEY = 'docmanage:index_generation'
+
+_redis_client = get_redis_client(SEARCH_CACHE_REDIS_URL) if SEARCH_RESULT_CACHE_SIZE > 0 else None
+
+if SEARCH_RESULT_CACHE_SIZE <= 0:
+    _search_result_cache = None
+elif _redis_client is not None:
+    _search_result_cache = RedisBackedCache(
+        _redis_client, 'docmanage:search:',
+        max_size=SEARCH_RESULT_CACHE_SIZE, ttl=SEARCH_RESULT_CACHE_TTL
+    )
+    logger.info(f"检索结果Redis共享缓存已启用 - TTL: {SEARCH_RESULT_CACHE_TTL}秒")
+else:
+    _search_result_cache = LLMResultCache(max_size=SEARCH_RESULT_CACHE_SIZE, ttl=SEARCH_RESULT_CACHE_TTL)
+
+def get_index_generation() -> int:
+    """获取当前向量数据版本号（启用Redis时读取共享版本号）"""
+    if _redis_client is not None:
+        try:
+            return int(_redis_client.get(_REDIS_GENERATION_KEY) or 0)
+        except Exception as e:
+            logger.debug(f"读取Redis向量数据版本号失败，使用本地版本号: {e}")
+    return _index_generation
+
+def bump_index_generation():
+    """向量数据发生变化后调用，使依赖检索结果的缓存失效"""
+    global _index_generation
+    with _index_generation_lock:
+        _index_generation += 1
+
+    if _redis_client is not None:
+        try:
+            _redis_client.incr(_REDIS_GENERATION_KEY)
+        except Exception as e:
+            logger.warning(f"更新Redis向量数据版本号失败: {e}")
+
+def get_cached_search_results(key) -> Optional[List[List[Dict[str, Any]]]]:
+    """读取检索结果缓存；调用方会修改结果字典（如标记search_type），因此返回副本"""
+    if _search_result_cache is None:
+        return None
+    cached = _search_result_cache.get(key)
+    if cached is None:
+        return None
+    return [[dict(doc) for doc in docs] for docs in cached]
+
+def cache_search_results(key, batch_docs: List[List[Dict[str, Any]]]):
+    """写入检索结果缓存（保存副本，避免调用方后续修改影响缓存内容）"""
+    if _search_result_cache is not None:
+        _search_result_cache.set(key, [[dict(doc) for doc in docs] for docs in batch_docs])
+
+def get_search_result_cache_stats() -> Optional[Dict[str, Any]]:
+    """获取检索结果缓存统计信息，未启用时返回None"""
+    return _search_result_cache.get_stats() if _search_result_cache is not None else None
@@ -4,9 +4,11 @@
 """
 import logging
 import os
+import time
+import threading
 from typing import List, Dict, Any, Optional
 
-from .base_vectorizer import BaseVectorizer
+from .base_vectorizer import BaseVectorizer, build_index_params
 from .pdf_vectorizer import PDFVectorizer
 
 logger = logging.getLogger(__name__)
@@ -64,11 +66,7 @@ class VectorServiceAdapter(BaseVectorizer):
             collection = Collection(self.collection_name, schema)
             
             # 创建索引
-            index_params = {
-                "metric_type": "COSINE",
-                "index_type": "IVF_FLAT",
-                "params": {"nlist": 1024}
-            }
+            index_params = build_index_params(nlist=1024)
             collection.create_index("vector", index_params)
             
             logger.info(f"✅ Created collection: {self.collection_name}")
@@ -157,4 +155,56 @@ class VectorServiceAdapter(BaseVectorizer):
     
     def search(self, query_text: str, top_k: int = 10, document_id: str = None, min_score: float = 0.0) -> List[Dict[str, Any]]:
         """搜索相似文档（兼容旧接口）"""
-        return self.search_similar(query_text, top_k, document_id, min_score) 
\ No newline at end of file
+        return self.search_similar(query_text, top_k, document_id, min_score) 
+
+
+# 全局适配器实例（按连接参数缓存）
+_adapter_instances = {}
+_adapter_lock = threading.Lock()
+
+def get_vector_service(milvus_host: str = None, milvus_port: int = None, embedding_model: str = None) -> VectorServiceAdapter:
+    """获取共享的向量服务适配器
+    
+    构造适配器会重建Milvus连接并加载嵌入模型，因此按(host, port, model)缓存实例；
+    初始化失败（如Milvus不可用）的实例不缓存，下次调用时重试。
+    """
+    key = (
+        milvus_host or os.getenv('MILVUS_HOST', 'localhost'),
+        int(milvus_port or os.getenv('MILVUS_PORT', '19530')),
+        embedding_model or os.getenv('EMBEDDING_MODEL', 'all-MiniLM-L6-v2')
+    )
+    
+    with _adapter_lock:
+        adapter = _adapter_instances.get(key)
+        if adapter is None:
+            adapter = VectorServiceAdapter(*key)
+            if adapter.is_available:
+                _adapter_instances[key] = adapter
+                logger.info(f"向量服务适配器已缓存: {key[0]}:{key[1]}, 模型: {key[2]}")
+        return adapter
+
+
+# 系统配置中的向量服务连接参数，短时间缓存以避免每次请求查询数据库
+VECTOR_CONFIG_CACHE_TTL = 60
+_vector_config_cache = {'value': None, 'expires_at': 0.0}
+
+def get_vector_service_config():
+    """获取系统配置中的(milvus_host, milvus_port, embedding_model)，结果缓存VECTOR_CONFIG_CACHE_TTL秒
+    
+    需要在应用上下文中调用。
+    """
+    from app.models import SystemConfig
+    
+    now = time.monotonic()
+    if _vector_config_cache['value'] is None or _vector_config_cache['expires_at'] < now:
+        _vector_config_cache['value'] = (
+            SystemConfig.get_config('milvus_host', 'localhost'),
+            SystemConfig.get_config('milvus_port', 19530),
+            SystemConfig.get_config('embedding_model')
+        )
+        _vector_config_cache['expires_at'] = now + VECTOR_CONFIG_CACHE_TTL
+    return _vector_config_cache['value']
+
+def get_configured_vector_service() -> VectorServiceAdapter:
+    """获取按系统配置连接的共享向量服务适配器"""
+    return get_vector_service(*get_vector_service_config())
@@ -51,6 +51,18 @@ class Config:
     # 模型配置
     EMBEDDING_MODEL = os.environ.get('EMBEDDING_MODEL') or 'all-MiniLM-L6-v2'
     
+    # 搜索配置
+    # 文档名称搜索使用全文索引（需先执行 database/add_search_indexes.sql）
+    ENABLE_NAME_FULLTEXT_SEARCH = os.environ.get('ENABLE_NAME_FULLTEXT_SEARCH', 'false').lower() == 'true'
+    # 意图分析与关键词提取两次LLM调用并行执行（意图为聊天/MCP操作时关键词提取结果会被丢弃）
+    ENABLE_PARALLEL_KEYWORD_EXTRACTION = os.environ.get('ENABLE_PARALLEL_KEYWORD_EXTRACTION', 'true').lower() == 'true'
+    # 应用启动时后台预热向量服务（Milvus连接与嵌入模型）
+    ENABLE_VECTOR_SERVICE_WARMUP = os.environ.get('ENABLE_VECTOR_SERVICE_WARMUP', 'true').lower() == 'true'
+    # 混合搜索中优化后的查询与原查询一起批量检索（一次Milvus请求），融合两者的语义结果
+    ENABLE_ORIGINAL_QUERY_FUSION = os.environ.get('ENABLE_ORIGINAL_QUERY_FUSION', 'true').lower() == 'true'
+    # 过短或仅由停用词组成的查询跳过语义检索（不做嵌入推理与Milvus请求）
+    ENABLE_SEMANTIC_QUERY_PREFILTER = os.environ.get('ENABLE_SEMANTIC_QUERY_PREFILTER', 'true').lower() == 'true'
+    
     # LLM配置
     LLM_PROVIDERS = {
         'openai': {
@@ -170,6 +182,18 @@ class Config:
     LLM_MAX_TOKENS = int(os.environ.get('LLM_MAX_TOKENS') or 500)
     LLM_TEMPERATURE = float(os.environ.get('LLM_TEMPERATURE') or 0.7)
     
+    # LLM结果缓存（关键词提取、查询优化、答案生成）
+    ENABLE_LLM_CACHE = os.environ.get('ENABLE_LLM_CACHE', 'true').lower() == 'true'
+    LLM_CACHE_MAX_SIZE = int(os.environ.get('LLM_CACHE_MAX_SIZE') or 1024)
+    LLM_CACHE_TTL = int(os.environ.get('LLM_CACHE_TTL') or 3600)
+    # 多worker共享LLM结果缓存的Redis地址（如 redis://localhost:6379/0），为空时仅使用进程内缓存
+    LLM_CACHE_REDIS_URL = os.environ.get('LLM_CACHE_REDIS_URL', '').strip()
+    
+    # 搜索接口响应缓存（相同查询参数在TTL内直接返回，向量数据变化时自动失效）
+    ENABLE_SEARCH_RESPONSE_CACHE = os.environ.get('ENABLE_SEARCH_RESPONSE_CACHE', 'true').lower() == 'true'
+    SEARCH_RESPONSE_CACHE_MAX_SIZE = int(os.environ.get('SEARCH_RESPONSE_CACHE_MAX_SIZE') or 2048)
+    SEARCH_RESPONSE_CACHE_TTL = int(os.environ.get('SEARCH_RESPONSE_CACHE_TTL') or 30)
+    
     # 应用服务配置
     APP_HOST = os.environ.get('APP_HOST') or '0.0.0.0'
     APP_PORT = int(os.environ.get('APP_PORT') or 5001)
@@ -179,6 +203,11 @@ class Config:
         'enabled': os.environ.get('MCP_ENABLED', 'true').lower() == 'true',
         'timeout': int(os.environ.get('MCP_TIMEOUT') or 30),  # 工具调用超时时间（秒）
         'max_concurrent_tools': int(os.environ.get('MCP_MAX_CONCURRENT_TOOLS') or 3),  # 最大并发工具数
+        # 允许同一批次并发执行的工具（逗号分隔），默认为空即所有步骤按顺序执行；
+        # 仅当执行序列中所有工具都在列表中时才按depends_on并发执行
+        'parallel_safe_tools': frozenset(
+            name.strip() for name in (os.environ.get('MCP_PARALLEL_SAFE_TOOLS') or '').split(',') if name.strip()
+        ),
         'app_url': os.environ.get('MCP_APP_URL') or f'http://localhost:{int(os.environ.get("APP_PORT") or 5001)}',
         'playwright': {
             'element_timeout': int(os.environ.get('MCP_ELEMENT_TIMEOUT') or 5000),  # 元素等待超时（毫秒）
@@ -0,0 +1,43 @@
+-- =====================================================
+-- 搜索索引升级脚本
+-- =====================================================
+--
+-- 适用于已使用旧版 merged_database_setup.sql 创建的数据库，
+-- 新建数据库无需执行（建表语句中已包含以下索引）。
+--
+-- 执行方式：
+-- mysql -u root -p document_management < database/add_search_indexes.sql
+--
+-- 执行完成后在 config.env 中设置 ENABLE_NAME_FULLTEXT_SEARCH=true，
+-- 文档名称搜索将改用 MATCH ... AGAINST 走全文索引，而不是 LIKE '%关键词%' 全表扫描。
+-- 同时补充 is_deleted + parent_id + file_type 组合索引，用于未删除节点的目录/类型过滤；
+-- is_deleted + name 组合索引，用于按名称精确定位未删除文档；
+-- is_deleted + type + file_type + is_vectorized 覆盖索引，用于搜索统计的分组计数。
+--
+-- 注意：需要 MySQL 5.7.6+（内置 ngram 分词器），ngram_token_size 使用默认值 2。
+-- =====================================================
+
+USE document_management;
+
+-- 文档名称全文索引（ngram分词，支持中文）
+ALTER TABLE document_nodes ADD FULLTEXT INDEX ft_name (name) WITH PARSER ngram;
+
+-- 组合索引：未删除节点按父目录、文件类型过滤
+ALTER TABLE document_nodes ADD INDEX idx_deleted_parent_file_type (is_deleted, parent_id, file_type);
+
+-- 组合索引：未删除节点按名称精确匹配（文档生成按名称定位源文件/文件夹）
+ALTER TABLE document_nodes ADD INDEX idx_deleted_name (is_deleted, name);
+
+-- 覆盖索引：搜索统计按类型、文件类型分组计数
+ALTER TABLE document_nodes ADD INDEX idx_deleted_type_file_type (is_deleted, type, file_type, is_vectorized);
+
+-- 检查索引创建情况
+SELECT 
+    INDEX_NAME as '索引名',
+    COLUMN_NAME as '列名',
+    INDEX_TYPE as '索引类型'
+FROM INFORMATION_SCHEMA.STATISTICS 
+WHERE TABLE_SCHEMA = 'document_management' 
+AND TABLE_NAME = 'document_nodes'
+AND INDEX_NAME != 'PRIMARY'
+ORDER BY INDEX_NAME;
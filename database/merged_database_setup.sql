@@ -63,6 +63,15 @@ CREATE TABLE IF NOT EXISTS document_nodes (
     INDEX idx_is_vectorized (is_vectorized),
     INDEX idx_vector_status (vector_status),
     INDEX idx_vectorized_at (vectorized_at),
+    -- 组合索引：未删除节点按父目录、文件类型过滤（文档树、搜索的二级过滤）
+    INDEX idx_deleted_parent_file_type (is_deleted, parent_id, file_type),
+    -- 组合索引：未删除节点按名称精确匹配（文档生成按名称定位源文件/文件夹）
+    INDEX idx_deleted_name (is_deleted, name),
+    -- 覆盖索引：搜索统计按类型、文件类型分组计数及统计已向量化数量，无需回表
+    INDEX idx_deleted_type_file_type (is_deleted, type, file_type, is_vectorized),
+    
+    -- 全文索引（ngram分词，支持中文名称的模糊搜索）
+    FULLTEXT INDEX ft_name (name) WITH PARSER ngram,
     
     -- 外键约束
     FOREIGN KEY (parent_id) REFERENCES document_nodes(id) ON DELETE CASCADE
@@ -62,10 +62,13 @@ def main():
         logger.info("启动智能文档...")
         logger.info(f"访问地址: http://{host}:{port}")
         
+        # 多线程处理请求：检索请求主要阻塞在Milvus/LLM/数据库I/O上，线程间可以重叠等待
+        # 调试模式跟随配置（FLASK_CONFIG=production时关闭调试器和自动重载）
         app.run(
             host=host,
             port=port,
-            debug=True
+            debug=app.config.get('DEBUG', False),
+            threaded=True
         )
         
     except Exception as e: